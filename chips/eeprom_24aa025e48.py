@@ -82,7 +82,8 @@ class EEPROM24AA025E48(EE24AA02XEXX):
     def eui64(self) -> List[int]:
         # see EUI-64 support using the 24AAXXXE48
         # on page 14 in https://ww1.microchip.com/downloads/en/devicedoc/20002124g.pdf
-        return [*self.eui48[:3], 0xFF, 0xFE, *self.eui48[3:]]
+        eui48 = self.eui48
+        return [*eui48[:3], 0xFF, 0xFE, *eui48[3:]]
 
 
 class EEPROM24AA02E48(EE24AA02XEXX):
@@ -98,4 +99,5 @@ class EEPROM24AA02E48(EE24AA02XEXX):
     def eui64(self) -> List[int]:
         # see EUI-64 support using the 24AAXXXE48
         # on page 14 in https://ww1.microchip.com/downloads/en/devicedoc/20002124g.pdf
-        return [*self.eui48[:3], 0xFF, 0xFE, *self.eui48[3:]]
+        eui48 = self.eui48
+        return [*eui48[:3], 0xFF, 0xFE, *eui48[3:]]
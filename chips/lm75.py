@@ -15,6 +15,11 @@ LM75_REGISTER_THYST = 0x02
 LM75_REGISTER_TOS = 0x03
 LM75_REGISTER_PRODID = 0x07
 
+# Temperature registers hold 9-bit two's complement value (0.5 degC per LSB)
+# in the upper bits, so all possible readings are precomputed and indexed by
+# those 9 bits
+_TEMPERATURE_LUT = tuple((i - 0x200 if i & 0x100 else i) * 0.5 for i in range(0x200))
+
 
 class LM75:
     _temperature = ROUnaryStruct(LM75_REGISTER_TEMP, ">h")
@@ -27,17 +32,25 @@ class LM75:
     _prodid = ROBits(7, LM75_REGISTER_PRODID, 0, 1)
 
     def __init__(
-        self, i2c_bus: I2C, device_address: int = LM75_DEFAULT_ADDRESS
+        self,
+        i2c_bus: I2C,
+        device_address: int = LM75_DEFAULT_ADDRESS,
+        probe: bool = True,
     ) -> None:
-        self.i2c_device = i2cdevice.I2CDevice(i2c_bus, device_address)
+        self.i2c_device = i2cdevice.I2CDevice(i2c_bus, device_address, probe=probe)
+
+    @property
+    def raw_temperature(self) -> int:
+        """Raw temperature register value; the 9-bit reading is in bits 15-7."""
+        return self._temperature
 
     @property
     def temperature(self) -> float:
-        return (self._temperature >> 7) * 0.5
+        return _TEMPERATURE_LUT[(self._temperature >> 7) & 0x1FF]
 
     @property
     def temperature_hysteresis(self) -> float:
-        return (self._temp_hysteresis >> 7) * 0.5
+        return _TEMPERATURE_LUT[(self._temp_hysteresis >> 7) & 0x1FF]
 
     @temperature_hysteresis.setter
     def temperature_hysteresis(self, value: float) -> None:
@@ -45,7 +58,7 @@ class LM75:
 
     @property
     def temperature_shutdown(self) -> float:
-        return (self._temp_shutdown >> 7) * 0.5
+        return _TEMPERATURE_LUT[(self._temp_shutdown >> 7) & 0x1FF]
 
     @temperature_shutdown.setter
     def temperature_shutdown(self, value: float) -> None:
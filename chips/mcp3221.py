@@ -6,7 +6,6 @@ MCP3221_DEFAULT_ADDRESS = 0x4D
 MCP3221_MAX_SUPPLY_VOLTAGE = 5.5
 MCP3221_MIN_SUPPLY_VOLTAGE = 2.7
 
-_BUFFER = bytearray(2)
 class MCP3221:
     def __init__(self, i2c_bus: I2C, device_address: int = MCP3221_DEFAULT_ADDRESS, reference_voltage: float = 3.3):
         self.i2c_device = i2c_device.I2CDevice(i2c_bus, device_address, probe=True)
@@ -14,6 +13,9 @@ class MCP3221:
             self._reference_voltage = reference_voltage
         else:
             raise ValueError("Reference voltage must be between 2.7V and 5.5V.")
+        # preallocated per device, so concurrent reads of different devices
+        # (e.g. on different DIOT cards) don't share the buffer
+        self._buffer = bytearray(2)
 
     @property
     def reference_voltage(self) -> float:
@@ -23,8 +25,8 @@ class MCP3221:
 
     def _read_data(self):
         with self.i2c_device as device:
-            device.readinto(_BUFFER)
-            return ((_BUFFER[0] << 8) | _BUFFER[1])# & 0xFFF
+            device.readinto(self._buffer)
+            return ((self._buffer[0] << 8) | self._buffer[1])# & 0xFFF
 
     @property
     def voltage(self) -> float:
@@ -1,11 +1,11 @@
 # TO CHECK
 
-import board
 from busio import I2C
 from typing_extensions import Literal
 from circuitpython_typing import ReadableBuffer, WriteableBuffer
+import threading
 import time
-from typing import List
+from typing import Iterable, List, Optional
 
 from micropython import const
 
@@ -19,10 +19,23 @@ class PCA9544A_Channel:
 
     def _channel_op(func):
         def wrapper(self, *args, **kwargs):
-            self.pca.i2c.writeto(self.pca.address, self.channel_code)
-            ret = func(self, *args, **kwargs)
-            self.pca.i2c.writeto(self.pca.address, b"\x00")
-            return ret
+            # the mux keeps the channel selected between operations, so the
+            # control byte is written only when switching to a different channel;
+            # selection and the transaction are done under one lock, so another
+            # thread can't switch the channel in between
+            with self.pca._lock:
+                if self.pca._selected is not self.channel_code:
+                    self.pca.i2c.writeto(self.pca.address, self.channel_code)
+                    self.pca._selected = self.channel_code
+                self.pca._in_channel_op = True
+                try:
+                    return func(self, *args, **kwargs)
+                except Exception:
+                    # state of the mux is unknown after a failed transaction
+                    self.pca._selected = None
+                    raise
+                finally:
+                    self.pca._in_channel_op = False
 
         return wrapper
 
@@ -67,9 +80,17 @@ class PCA9544A_Channel:
         )
 
     @_channel_op
-    def scan(self, write: bool = False) -> List[int]:
-        """Perform an I2C Device Scan"""
-        return self.pca.i2c.scan(write)
+    def scan(
+        self, write: bool = False, addresses: Optional[Iterable[int]] = None
+    ) -> List[int]:
+        """Perform an I2C Device Scan, skipping the mux and blacklisted addresses"""
+        skip = {self.pca.address, *getattr(self.pca.i2c, "scan_blacklist", ())}
+        if addresses is None:
+            found = self.pca.i2c.scan(write)
+        else:
+            addresses = [addr for addr in addresses if addr not in skip]
+            found = self.pca.i2c.scan(write, addresses=addresses)
+        return [addr for addr in found if addr not in skip]
 
     def poll(self, device_address: int) -> None:
         """implementation taken from i2c_device.I2CDevice.__poll_for_device()"""
@@ -96,6 +117,11 @@ class PCA9544A:
         self.i2c = i2c
         self.address = address
         self.channels = [None] * 4
+        # control byte of the currently selected channel (None if unknown)
+        self._selected = None
+        self._lock = threading.RLock()
+        # True while a channel operation is in progress (see 'deselect')
+        self._in_channel_op = False
 
     def __len__(self) -> Literal[4]:
         return 4
@@ -106,3 +132,19 @@ class PCA9544A:
         if self.channels[key] is None:
             self.channels[key] = PCA9544A_Channel(self, key)
         return self.channels[key]
+
+    def deinit(self) -> None:
+        """Disable all mux channels and forget the cached selection."""
+        with self._lock:
+            self._selected = None
+            self.i2c.writeto(self.address, b"\x00")
+
+    def deselect(self) -> None:
+        """Disconnect downstream channels from the upstream bus.
+
+        Does nothing when called from within a channel operation (e.g. when
+        the upstream bus is scanned on behalf of a channel scan).
+        """
+        with self._lock:
+            if not self._in_channel_op:
+                self.deinit()
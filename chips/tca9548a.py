@@ -7,7 +7,8 @@
 """
 Modified CircuitPython driver for the TCA9548A I2C switch
 with channel operation wrapper added, that changes driver's behaviour
-- releases TCA9548A bus after every operation to avoid bus locking.
+- tracks the selected channel, so the switch is reprogrammed only when
+  an operation targets a different channel than the previous one.
 
 * Author(s): Carter Nelson, Mikołaj Sowiński, Jakub Matyas
 
@@ -30,6 +31,7 @@ Implementation Notes
 
 """
 
+import threading
 import time
 
 from micropython import const
@@ -60,10 +62,23 @@ class TCA9548A_Channel:
 
     def _channel_op(func):
         def wrapper(self, *args, **kwargs):
-            self.tca.i2c.writeto(self.tca.address, self.channel_switch)
-            ret = func(self, *args, **kwargs)
-            self.tca.i2c.writeto(self.tca.address, b"\x00")
-            return ret
+            # the switch keeps the channel selected between operations, so the
+            # control byte is written only when switching to a different channel;
+            # selection and the transaction are done under one lock, so another
+            # thread can't switch the channel in between
+            with self.tca._lock:
+                if self.tca._selected is not self.channel_switch:
+                    self.tca.i2c.writeto(self.tca.address, self.channel_switch)
+                    self.tca._selected = self.channel_switch
+                self.tca._in_channel_op = True
+                try:
+                    return func(self, *args, **kwargs)
+                except Exception:
+                    # state of the switch is unknown after a failed transaction
+                    self.tca._selected = None
+                    raise
+                finally:
+                    self.tca._in_channel_op = False
 
         return wrapper
 
@@ -139,6 +154,11 @@ class TCA9548A:
         self.i2c = i2c
         self.address = address
         self.channels = [None] * 8
+        # control byte of the currently selected channel (None if unknown)
+        self._selected = None
+        self._lock = threading.RLock()
+        # True while a channel operation is in progress (see 'deselect')
+        self._in_channel_op = False
 
     def __len__(self) -> Literal[8]:
         return 8
@@ -150,6 +170,22 @@ class TCA9548A:
             self.channels[key] = TCA9548A_Channel(self, key)
         return self.channels[key]
 
+    def deinit(self) -> None:
+        """Disable all switch channels and forget the cached selection."""
+        with self._lock:
+            self._selected = None
+            self.i2c.writeto(self.address, b"\x00")
+
+    def deselect(self) -> None:
+        """Disconnect downstream channels from the upstream bus.
+
+        Does nothing when called from within a channel operation (e.g. when
+        the upstream bus is scanned on behalf of a channel scan).
+        """
+        with self._lock:
+            if not self._in_channel_op:
+                self.deinit()
+
 
 class PCA9546A:
     """Class which provides interface to TCA9546A I2C switch."""
@@ -158,6 +194,11 @@ class PCA9546A:
         self.i2c = i2c
         self.address = address
         self.channels = [None] * 4
+        # control byte of the currently selected channel (None if unknown)
+        self._selected = None
+        self._lock = threading.RLock()
+        # True while a channel operation is in progress (see 'deselect')
+        self._in_channel_op = False
 
     def __len__(self) -> Literal[4]:
         return 4
@@ -168,3 +209,19 @@ class PCA9546A:
         if self.channels[key] is None:
             self.channels[key] = TCA9548A_Channel(self, key)
         return self.channels[key]
+
+    def deinit(self) -> None:
+        """Disable all switch channels and forget the cached selection."""
+        with self._lock:
+            self._selected = None
+            self.i2c.writeto(self.address, b"\x00")
+
+    def deselect(self) -> None:
+        """Disconnect downstream channels from the upstream bus.
+
+        Does nothing when called from within a channel operation (e.g. when
+        the upstream bus is scanned on behalf of a channel scan).
+        """
+        with self._lock:
+            if not self._in_channel_op:
+                self.deinit()
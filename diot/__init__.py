@@ -1,6 +1,12 @@
 from .cards import DIOTCard
-from .channel import Channel
+from .channel import Channel, ChannelReport
 from .manager import DIOTCrateManager
 from .monitor import MonitoringSession
 
-__all__ = ["Channel", "DIOTCard", "DIOTCrateManager", "MonitoringSession"]
+__all__ = [
+    "Channel",
+    "ChannelReport",
+    "DIOTCard",
+    "DIOTCrateManager",
+    "MonitoringSession",
+]
@@ -1,16 +1,23 @@
+import functools
+import logging
 import os
+import struct
+import threading
+import time
 
+import numpy as np
 from adafruit_blinka.microcontroller.ftdi_mpsse.mpsse.i2c import I2C as _I2C
 from adafruit_pca9685 import PCA9685
 from busio import I2C
 from pyftdi.eeprom import FtdiEeprom
+from pyftdi.ftdi import FtdiError
 
 from chips.eeprom_24aa025e48 import EEPROM24AA02E48
 from chips.lm75 import LM75
 from chips.mcp3221 import MCP3221
 from chips.pca9544 import PCA9544A
-from diot.channel import Channel, SensorChannel
-from diot.utils.i2c_utils import make_i2c_graph
+from diot.channel import Channel, ChannelReport, SensorChannel
+from diot.utils.i2c_utils import I2C_FIRST_ADDR, I2C_LAST_ADDR, make_i2c_graph
 
 # it corresponds to "93C46" chip; possible values are "93C56" and "93C66"
 # but on DIOT cards we use "93C46" (0x46)
@@ -18,6 +25,53 @@ FTDI_EEPROM_CHIP_TYPE = 0x46
 
 SOFT_OT_THRESHOLD = 5  # degrees Celsius
 
+# voltage and current read within this time (in seconds) share one ADC sample
+ADC_SAMPLE_TTL = 0.05
+
+# re-set I2C frequency after opening FTDI device (see 'DIOTCard.init_i2c')
+FORCE_I2C_FREQUENCY = os.environ.get("DIOT_FORCE_FREQ", "1") != "0"
+
+# I2C bus frequency; all devices on DIOT card (LM75, MCP3221, PCA9544A, PCA9685
+# and 24AA02E48) support Fast Mode (400 kHz), but not all of them support
+# Fast Mode Plus (1 MHz)
+I2C_FREQUENCY = 400000
+
+# USB latency timer of FTDI device; default 16 ms stalls every short I2C
+# transaction (which is every transaction on DIOT card)
+FTDI_LATENCY_MS = 2
+
+# addresses of devices populated on DIOT card (on shared bus and behind the mux):
+# PCA9685 PWM drivers, LM75 sensors, MCP3221 ADCs, EEPROM and PCA9544A mux
+DIOT_I2C_ADDRESSES = (0x40, 0x41, *range(0x48, 0x50), 0x50, 0x70)
+
+# PCA9685 MODE1 register with only auto-increment (AI) bit set - oscillator on,
+# ALLCALL and SUBx addresses disabled. ALLCALL must stay disabled: its address
+# (0x70) is the same as PCA9544A mux address, so PCA9685s on the selected mux
+# channel would also receive every mux control byte
+PCA9685_MODE1_AI = 0x20
+
+# first register of PCA9685 LED outputs (LED0_ON_L); each of 16 outputs has 4
+# registers: ON_L, ON_H, OFF_L, OFF_H
+PCA9685_LED0_ON_L = 0x06
+
+# Blinka's '_I2C' picks the FTDI device from BLINKA_FT232H environment variable,
+# so setting it and opening the device must not interleave between threads
+_FTDI_OPEN_LOCK = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def _pca9685_on_off(duty_cycle: int) -> tuple[int, int]:
+    """Convert 16-bit duty cycle to PCA9685 (ON, OFF) register values.
+
+    Mirrors 'PWMChannel.duty_cycle' setter from adafruit_pca9685.
+    """
+    if duty_cycle == 0xFFFF:
+        return 0x1000, 0  # fully on
+    if duty_cycle < 0x0010:
+        return 0, 0x1000  # fully off
+    return 0, duty_cycle >> 4
+
 
 class DIOTCard(I2C):
     """Controller for a single DIOT card in the crate.
@@ -29,10 +83,11 @@ class DIOTCard(I2C):
     def __init__(
         self,
         url: str = "ftdi://ftdi:232h:/1",
-        frequency: int = 100000,
+        frequency: int = I2C_FREQUENCY,
         ot_shutdown: float = 80,
         hysteresis: float = 75,
         serial: str | None = None,
+        latency_ms: int = FTDI_LATENCY_MS,
     ) -> None:
         """Initialize the DIOT Card controller.
 
@@ -42,6 +97,7 @@ class DIOTCard(I2C):
             ot_shutdown: Default over-temperature shutdown threshold
             hysteresis: Default hysteresis value
             serial: FTDI serial number in format "DTxx" where xx is 0-8
+            latency_ms: FTDI USB latency timer in milliseconds
 
         """
 
@@ -50,28 +106,39 @@ class DIOTCard(I2C):
         # connected to the system
         if serial is not None:
             url = f"ftdi://::{serial}/1"
-        # needed for '_I2C' from pyFTDI to work if there are more than one FTDI
-        # devices connected to the system
-        os.environ["BLINKA_FT232H"] = url
+        self.url = url
 
         # No reinitialization is needed in case the OT event happens - power is
         # turned off only of heaters (and I2C buffers), and not of the ICs
-        self.init_i2c(frequency=frequency)
+        self.init_i2c(frequency=frequency, latency_ms=latency_ms)
         self.init_devices()
         self.init_config(ot_shutdown, hysteresis)
         self._initialized = True
 
-    def init_i2c(self, frequency: int = 100000) -> None:
+    def init_i2c(
+        self, frequency: int = I2C_FREQUENCY, latency_ms: int = FTDI_LATENCY_MS
+    ) -> None:
         self.deinit()
+        with _FTDI_OPEN_LOCK:
+            # needed for '_I2C' from pyFTDI to work if there are more than one
+            # FTDI devices connected to the system
+            os.environ["BLINKA_FT232H"] = self.url
+            self._i2c = _I2C(frequency=frequency)
+        ftdi = self._i2c._i2c.ftdi
         # this is workaround; it seems that without setting the frequency explicitly
         # the FTDI device is unable to communicate with devices on I2C bus every
         # second time the program is run (it's rather not a problem with the device,
         # but with the library or configuration). From the scope it seems that
         # FTDI produces START condition, but no data is sent afterwards (it doesn't
         # produce clock..., however, STOP condition is sent).
-        self._i2c = _I2C(frequency=frequency)
-        ftdi = self._i2c._i2c.ftdi
-        ftdi.set_frequency(frequency)
+        # '_I2C' already sets the frequency, so it can be skipped with
+        # DIOT_FORCE_FREQ=0 once the root cause is fixed.
+        if FORCE_I2C_FREQUENCY:
+            ftdi.set_frequency(frequency)
+        try:
+            ftdi.set_latency_timer(latency_ms)
+        except (ValueError, FtdiError) as e:
+            logger.warning(f"Failed to set FTDI latency timer to {latency_ms} ms: {e}")
         self.ftdi_ee = FtdiEeprom()
 
         # without below, pyFTDI's FtdiEeprom gets EEPROM size that by default is
@@ -96,10 +163,17 @@ class DIOTCard(I2C):
             self.i2c_mux[3],
         ]
 
+        # LM75s are not probed on construction - 'init_config' writes thresholds
+        # to every one of them, so a missing sensor is reported there anyway
+
         # Mux channels 0 and 1 swapped
         self.lm75s = [
-            LM75(self.i2c_buses[1], device_address=0x48 + addr) for addr in range(8)
-        ] + [LM75(self.i2c_buses[0], device_address=0x48 + addr) for addr in range(8)]
+            LM75(self.i2c_buses[1], device_address=0x48 + addr, probe=False)
+            for addr in range(8)
+        ] + [
+            LM75(self.i2c_buses[0], device_address=0x48 + addr, probe=False)
+            for addr in range(8)
+        ]
 
         self.i_monitor = MCP3221(
             self.i2c_buses[2], device_address=0x4D, reference_voltage=3.3
@@ -107,13 +181,18 @@ class DIOTCard(I2C):
         self.v_monitor = MCP3221(
             self.i2c_buses[3], device_address=0x4D, reference_voltage=3.3
         )
+        # last (current, voltage) sample and its timestamp
+        self._adc_sample = None
+        self._adc_sample_t = 0.0
 
         self.pwm_chips = [
             PCA9685(self.i2c_buses[2], address=0x40),
             PCA9685(self.i2c_buses[2], address=0x41),
         ]
+        # last frequency set on each PWM chip (None if not set by us)
+        self._pwm_frequencies = [None] * len(self.pwm_chips)
 
-        self.aux_lm75 = LM75(self.i2c_buses[3], device_address=0x48)
+        self.aux_lm75 = LM75(self.i2c_buses[3], device_address=0x48, probe=False)
         self.aux_load = self.pwm_chips[1].channels[0]
 
         self.load_channels = [
@@ -121,23 +200,43 @@ class DIOTCard(I2C):
         ] + [Channel(self.aux_load, self.aux_lm75, max_power=3)]
 
         self.diot_conn_channels = [
-            SensorChannel(LM75(self.i2c_buses[3], device_address=0x49)),  # P6 connector
-            SensorChannel(LM75(self.i2c_buses[3], device_address=0x4A)),  # P1 connector
+            # P6 connector
+            SensorChannel(LM75(self.i2c_buses[3], device_address=0x49, probe=False)),
+            # P1 connector
+            SensorChannel(LM75(self.i2c_buses[3], device_address=0x4A, probe=False)),
         ]
 
         # don't use the 3.3V channel for load power
         self.max_load_power = sum([ch.max_power for ch in self.load_channels[:-1]])
 
+        # Structure-of-arrays view of the channels, filled by 'read_all_fast':
+        # temperatures of all reported channels and power of all load channels
+        self._raw_temps = np.zeros(
+            len(self.load_channels) + len(self.diot_conn_channels), dtype=np.int16
+        )
+        self.temps = np.zeros(len(self._raw_temps), dtype=np.float32)
+        self.powers = np.zeros(len(self.load_channels), dtype=np.float32)
+
     def init_config(self, ot_shutdown: float = 80, hysteresis: float = 75) -> None:
-        """Initialize card with default settings"""
-        # enable auto-increment so we can write/read registers using CP structures
+        """Initialize card with default settings."""
+        # enable auto-increment so we can write/read registers using CP structures;
+        # PCA9685 driver resets MODE1 to 0x00 on construction, so there is no need
+        # to read the register back before setting the AI bit
+        # NOTE: this can't be a single ALLCALL broadcast - driver's reset clears
+        # ALLCALL bit, its default address (0x70) collides with PCA9544A mux and
+        # programming a common SUBADRx would cost more writes than it saves
         for pwm in self.pwm_chips:
-            read_mode1 = pwm.mode1_reg
-            pwm.mode1_reg = read_mode1 | 0x20
+            pwm.mode1_reg = PCA9685_MODE1_AI
 
         for channel in self.load_channels + self.diot_conn_channels:
             channel.set_configuration(ot_shutdown=ot_shutdown, hysteresis=hysteresis)
 
+        # PWM outputs keep their values over driver's reset, so the load power
+        # setpoints are read back once here; from now on they are cached by the
+        # channels and 'read_all_fast' doesn't touch PWM chips
+        for channel in self.load_channels:
+            channel.get_load_power()
+
         # FIXME: now it is assumed that software OT shutdown is set to SOFT_OT_THRESHOLD
         # degrees below the hardware shutdown threshold.
         self._soft_ot_shutdown = ot_shutdown - SOFT_OT_THRESHOLD
@@ -145,60 +244,114 @@ class DIOTCard(I2C):
 
     @property
     def card_id(self) -> str:
-        """Get the card identifier from serial number"""
+        """Get the card identifier from serial number."""
         return self.serial_id
 
-    @property
+    # EUI-48 is factory-programmed into the EEPROM, so it is read only once
+    @functools.cached_property
     def eui48(self) -> list[int]:
-        """Get the EEPROM EUI-48 address"""
+        """Get the EEPROM EUI-48 address."""
         return self.eeprom.eui48
 
-    @property
+    @functools.cached_property
     def eui64(self) -> list[int]:
-        """Get the EEPROM EUI-64 address"""
+        """Get the EEPROM EUI-64 address."""
         return self.eeprom.eui64
 
+    def _sample(self, ttl: float = ADC_SAMPLE_TTL) -> tuple[float, float]:
+        """Get (current, voltage) pair, reading both ADCs if sample is stale.
+
+        The sample is reused for 'ttl' seconds; ttl <= 0 always reads the ADCs.
+        """
+        now = time.monotonic()
+        if self._adc_sample is None or ttl <= 0 or now - self._adc_sample_t > ttl:
+            # there is a voltage divider of 1/4 on the board, so the voltage
+            # reading is 4 times lower than the actual voltage
+            voltage = self.v_monitor.voltage * 4
+            # IN195 senses current on 0.005 Ohm resistor and amplifies it by
+            # 100 V/V, which results in 0.5 V/A of 'transimpedance'.
+            current = self.i_monitor.voltage / 0.5
+            self._adc_sample = (current, voltage)
+            self._adc_sample_t = now
+        return self._adc_sample
+
+    def read_power_pair(self) -> tuple[float, float]:
+        """Read fresh (current, voltage) pair.
+
+        ADCs have the same address, so they are on different mux buses and
+        can't share one; both are read back-to-back with a single mux switch
+        between them. The cached sample is never reused here, but it is
+        refreshed for 'current' and 'voltage'.
+        """
+        return self._sample(ttl=0)
+
     @property
     def current(self) -> float:
-        """Get the current reading in Amperes"""
-        # IN195 senses current on 0.005 Ohm resistor and amplifies it by 100 V/V,
-        # which results in 0.5 V/A of 'transimpedance'.
-        voltage_reading = self.i_monitor.voltage
-        return voltage_reading / 0.5
+        """Get the current reading in Amperes.
+
+        The value may be up to ADC_SAMPLE_TTL (50 ms) old - it is shared with
+        'voltage' read within that window, so both come from the same sample.
+        Use 'read_power_pair' for a fresh reading.
+        """
+        return self._sample()[0]
 
     @property
     def voltage(self) -> float:
-        """Get the voltage reading in Volts"""
-        # there is a voltage divider of 1/4 on the board, so the voltage
-        # reading is 4 times lower than the actual voltage
-        voltage_reading = self.v_monitor.voltage
-        return voltage_reading * 4
-
-    def scan(self, write: bool = False) -> list[int]:
-        """Scan for I2C devices on the bus"""
+        """Get the voltage reading in Volts.
+
+        The value may be up to ADC_SAMPLE_TTL (50 ms) old (see 'current').
+        """
+        return self._sample()[1]
+
+    def scan(
+        self, write: bool = False, addresses: list[int] | None = None
+    ) -> list[int]:
+        """Scan for I2C devices on the bus."""
         # Override method from busio.i2c.scan, so it accepts one positional
-        # argument
-        return self._i2c.scan(write)
+        # argument; addresses from 'scan_blacklist' are never polled
+        if addresses is None:
+            addresses = range(I2C_FIRST_ADDR, I2C_LAST_ADDR + 1)
+        addresses = [addr for addr in addresses if addr not in self.scan_blacklist]
+        # mux keeps the last used channel selected - disable it, so devices
+        # behind the mux don't show up on the shared bus (it's a no-op when
+        # the bus is scanned on behalf of a mux channel)
+        self.i2c_mux.deselect()
+        return self._i2c.scan(write, addresses=addresses)
+
+    def scan_fast(self, write: bool = False) -> list[int]:
+        """Scan only addresses of devices known to be populated on DIOT card."""
+        return self.scan(write, addresses=DIOT_I2C_ADDRESSES)
+
+    def print_i2c_tree(self, full_scan: bool = False) -> None:
+        """Print the I2C device tree for debugging.
 
-    def print_i2c_tree(self) -> None:
-        """Print the I2C device tree for debugging"""
+        Args:
+            full_scan: Poll the whole address range instead of only addresses
+                of devices known to be populated on DIOT card
+
+        """
         # on each I2C bus there is EEPROM detected. it's due to the fact, that
         # the EEPROMs are connected BEFORE the I2C MUX so, they are always detected
         # (they just respond to polling on their address)
         for ix, bus in enumerate([self, *self.i2c_buses]):
             bus_name = "I2C Shared Bus" if ix == 0 else f"I2C Bus {ix}"
-            detected = bus.scan(write=True)
+            detected = bus.scan(
+                write=True, addresses=None if full_scan else DIOT_I2C_ADDRESSES
+            )
             print(f"{bus_name}:")
             print(make_i2c_graph(detected))
 
     def set_pwm_frequency(self, chip_no: int, frequency: int) -> None:
-        """Set the PWM frequency for a specific PWM chip"""
+        """Set the PWM frequency for a specific PWM chip."""
         if frequency < 24 or frequency > 1526:
             raise ValueError("Frequency must be between 24 and 1526 Hz")
+        if self._pwm_frequencies[chip_no] == frequency:
+            return
         self.pwm_chips[chip_no].frequency = frequency
+        self._pwm_frequencies[chip_no] = frequency
 
     def get_channel(self, channel_index: int) -> Channel:
-        """Get a specific load channel by index (0-16)"""
+        """Get a specific load channel by index (0-16)."""
         if not 0 <= channel_index < len(self.load_channels):
             raise ValueError(
                 f"Channel index must be between 0 and {len(self.load_channels) - 1}"
@@ -206,26 +359,102 @@ class DIOTCard(I2C):
         return self.load_channels[channel_index]
 
     def set_all_load_power(self, power: float) -> None:
-        """Set the same load power for all channels"""
-        for channel in self.load_channels[:-1]:
-            channel.load_power = power
+        """Set the same load power for all channels.
+
+        Raises:
+            ValueError: If power is negative.
+        """
+        # all 16 regular channels are outputs of the first PWM chip, so their
+        # duty cycles are written in one auto-increment burst; power is
+        # validated (and limited) by the channels before anything is packed
+        channels = self.load_channels[:-1]
+        duty_cycles = [channel.duty_cycle_for(power) for channel in channels]
+        if all(
+            channel.duty_cycle == duty_cycle
+            for channel, duty_cycle in zip(channels, duty_cycles, strict=True)
+        ):
+            return
+
+        regs = []
+        for duty_cycle in duty_cycles:
+            regs.extend(_pca9685_on_off(duty_cycle))
+        buffer = bytes([PCA9685_LED0_ON_L]) + struct.pack(f"<{len(regs)}H", *regs)
+        with self.pwm_chips[0].i2c_device as i2c:
+            i2c.write(buffer)
+
+        for channel, duty_cycle in zip(channels, duty_cycles, strict=True):
+            channel.set_cached_duty_cycle(duty_cycle)
 
     def shutdown_all_loads(self) -> None:
-        """Turn off all loads"""
-        self.set_all_load_power(0)
+        """Turn off all loads."""
+        try:
+            self.set_all_load_power(0)
+        finally:
+            # OT shutdown also powers down I2C buffers behind the mux - don't
+            # leave a channel attached to them
+            self.i2c_mux.deselect()
+
+    def read_all_fast(self) -> np.ndarray:
+        """Read temperatures of all channels into 'temps' array.
+
+        Raw LM75 registers are decoded in one vectorized operation; 'powers'
+        array is filled from the load power setpoints cached by the channels
+        (seeded in 'init_config'), so it costs no I2C traffic.
+
+        Returns:
+            Array of temperatures (in the same order as in 'report'). The array
+            is reused between calls, so copy it if needed.
+
+        """
+        for i, channel in enumerate(self.load_channels + self.diot_conn_channels):
+            self._raw_temps[i] = channel.temperature_sensor.raw_temperature
+        np.multiply(self._raw_temps >> 7, 0.5, out=self.temps)
+        for i, channel in enumerate(self.load_channels):
+            self.powers[i] = channel.load_power
+        return self.temps
+
+    def snapshot(self) -> dict:
+        """Read all card sensors in a single pass, ordered by mux bus.
+
+        Temperatures and load powers are returned as arrays (see
+        'read_all_fast'); 'report' builds per-channel reports on top of it.
+        """
+        temps = self.read_all_fast()
+        current, voltage = self.read_power_pair()
+        return {
+            "card_serial": self.card_id,
+            "voltage": voltage,
+            "current": current,
+            "temperature": temps,
+            "load_power": self.powers,
+            "ot_ev": temps >= self._soft_ot_shutdown,
+        }
 
     def report(self):
-        """Get a report of all channel parameters"""
-        channels_reports = []
-        for channel in self.load_channels + self.diot_conn_channels:
-            rep = channel.report()
-            rep["ot_ev"] = rep["temperature"] >= self._soft_ot_shutdown
-            channels_reports.append(rep)
+        """Get a report of all channel parameters."""
+        # all sensors are read in one pass by 'snapshot' - ordered by mux bus
+        # (LM75s on bus 1, bus 0, bus 3, then voltage on bus 3 and current on
+        # bus 2), so with mux channel caching the mux is switched only 4 times
+        # per report; per-channel reports are then built from its arrays and
+        # the thresholds and load power setpoints cached by the channels
+        snap = self.snapshot()
+        temps = snap["temperature"]
+        ot_ev = snap["ot_ev"]
+        channels_reports = [
+            ChannelReport(
+                float(temps[i]),
+                channel.hysteresis,
+                channel.ot_shutdown,
+                channel.load_power,  # None for channels without load
+                bool(ot_ev[i]),
+            )
+            for i, channel in enumerate(self.load_channels + self.diot_conn_channels)
+        ]
 
         rep = {
-            "card_serial": self.card_id,
-            "voltage": self.voltage,
-            "current": self.current,
+            "card_serial": snap["card_serial"],
+            "voltage": snap["voltage"],
+            "current": snap["current"],
             "channels": channels_reports,
         }
         return rep
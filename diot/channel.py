@@ -1,4 +1,5 @@
 import logging
+from typing import NamedTuple
 
 from adafruit_pca9685 import PWMChannel
 
@@ -7,11 +8,27 @@ from chips.lm75 import LM75
 logger = logging.getLogger(__name__)
 
 
+class ChannelReport(NamedTuple):
+    """Report of a single channel parameters."""
+
+    temperature: float
+    hysteresis: float
+    ot_shutdown: float
+    load_power: float | None
+    ot_ev: bool | None = None
+
+
 class SensorChannel:
     """Represents a single temperature sensor channel."""
 
+    __slots__ = ("_hysteresis_cached", "_ot_shutdown_cached", "temperature_sensor")
+
     def __init__(self, temperature_sensor: LM75):
         self.temperature_sensor = temperature_sensor
+        # thresholds are configuration registers that change only when written
+        # by us, so they are read from the sensor at most once
+        self._hysteresis_cached = None
+        self._ot_shutdown_cached = None
 
     # === LM75 properties ===
     @property
@@ -27,7 +44,7 @@ class SensorChannel:
     @property
     def hysteresis(self) -> float:
         """Get the hysteresis temperature setting."""
-        if not hasattr(self, "_hysteresis_cached"):
+        if self._hysteresis_cached is None:
             logger.debug("Hysteresis not cached, getting from sensor")
             self.get_hysteresis()
         return self._hysteresis_cached
@@ -46,7 +63,7 @@ class SensorChannel:
     @property
     def ot_shutdown(self) -> float:
         """Get the over-temperature shutdown setting."""
-        if not hasattr(self, "_ot_shutdown_cached"):
+        if self._ot_shutdown_cached is None:
             logger.debug("OT shutdown not cached, getting from sensor")
             self.get_ot_shutdown()
         return self._ot_shutdown_cached
@@ -80,19 +97,35 @@ class SensorChannel:
         if power is not None:
             self.load_power = power
 
-    def report(self) -> dict[str, float]:
-        """Get a report of all channel parameters."""
-        return {
-            "temperature": self.temperature,
-            "hysteresis": self.hysteresis,
-            "ot_shutdown": self.ot_shutdown,
-            "load_power": self.load_power,  # Placeholder for load power
-        }
+    def report(self, soft_ot_shutdown: float | None = None) -> ChannelReport:
+        """Get a report of all channel parameters.
+
+        Args:
+            soft_ot_shutdown: Software OT threshold; if given, 'ot_ev' field
+                tells whether the temperature reached it.
+        """
+        temperature = self.temperature
+        return ChannelReport(
+            temperature,
+            self.hysteresis,
+            self.ot_shutdown,
+            self.load_power,  # None for channels without load
+            None if soft_ot_shutdown is None else temperature >= soft_ot_shutdown,
+        )
 
 
 class Channel(SensorChannel):
     """Represents a single load channel with temperature monitoring and power control."""
 
+    __slots__ = (
+        "_duty_cycle",
+        "_duty_scale",
+        "_load_power_cached",
+        "_power_scale",
+        "max_power",
+        "pwm_channel",
+    )
+
     def __init__(
         self,
         pwm_channel: PWMChannel,
@@ -101,9 +134,15 @@ class Channel(SensorChannel):
     ):
         if max_power is None:
             max_power = 5  # 5 Watts
+        super().__init__(temperature_sensor)
         self.pwm_channel = pwm_channel
-        self.temperature_sensor = temperature_sensor
         self.max_power = max_power
+        # power <-> 16-bit duty cycle conversion factors
+        self._duty_scale = 0xFFFF / max_power
+        self._power_scale = max_power / 0xFFFF
+        self._load_power_cached = None
+        # last duty cycle written to (or read from) the PWM channel
+        self._duty_cycle = None
 
     # === PCA9685 properties ===
     @property
@@ -113,21 +152,35 @@ class Channel(SensorChannel):
 
     def get_load_power(self) -> float:
         """Get the current load power in Watts."""
+        self._duty_cycle = self.pwm_channel.duty_cycle
         self._load_power_cached = (
-            self.pwm_channel.duty_cycle / 0xFFFF * self.max_power
+            self._duty_cycle * self._power_scale
         )  # FIXME: check if this is correct
+        return self._load_power_cached
 
     @property
     def load_power(self) -> float:
         """Get the current load power in Watts."""
-        if not hasattr(self, "_load_power_cached"):
+        if self._load_power_cached is None:
             logger.debug("Load power not cached, getting from PWM channel")
             self.get_load_power()
         return self._load_power_cached
 
-    @load_power.setter
-    def load_power(self, power: float) -> None:
-        """Set the load power in Watts."""
+    @property
+    def duty_cycle(self) -> int | None:
+        """Get the last duty cycle written to the PWM channel (None if unknown)."""
+        return self._duty_cycle
+
+    def duty_cycle_for(self, power: float) -> int:
+        """Get the PWM duty cycle corresponding to the load power in Watts.
+
+        Power above 'max_power' is limited to 'max_power'.
+
+        Raises:
+            ValueError: If power is negative.
+        """
+        if power < 0:
+            raise ValueError(f"Power must not be negative, got {power} W")
         if power > self.max_power:
             # raise ValueError(f"Power must be less than {self.max_power} W")
             power = self.max_power
@@ -135,8 +188,23 @@ class Channel(SensorChannel):
                 f"Power set to maximum value of {self.max_power} W. "
                 f"Requested power was {power} W."
             )
+        return int(power * self._duty_scale)
 
-        duty_cycle = int(power / self.max_power * 0xFFFF)
-        self._load_power_cached = duty_cycle / 0xFFFF * self.max_power
+    def set_cached_duty_cycle(self, duty_cycle: int) -> None:
+        """Update cached setpoint after the duty cycle was written to PWM chip.
+
+        Used when the duty cycle is written outside of the channel, e.g. in
+        a burst write of all channels of a PWM chip.
+        """
+        self._duty_cycle = duty_cycle
+        self._load_power_cached = duty_cycle * self._power_scale
+
+    @load_power.setter
+    def load_power(self, power: float) -> None:
+        """Set the load power in Watts."""
+        duty_cycle = self.duty_cycle_for(power)
+        if duty_cycle == self._duty_cycle:
+            return
 
         self.pwm_channel.duty_cycle = duty_cycle
+        self.set_cached_duty_cycle(duty_cycle)
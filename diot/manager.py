@@ -1,11 +1,16 @@
 import logging
 import re
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import ParamSpec, TypeVar
 
-from diot.cards import DIOTCard
-from diot.utils.ftdi_utils import find_serial_numbers
+from diot.cards import I2C_FREQUENCY, DIOTCard
+from diot.utils.ftdi_utils import list_diot_cards
 
 logger = logging.getLogger(__name__)
 
+_P = ParamSpec("_P")
+_T = TypeVar("_T")
 
 SECONDS_PER_BOARD = 1.2
 
@@ -16,7 +21,7 @@ class DIOTCrateManager:
     def __init__(
         self,
         serial_numbers: list[str] | None = None,
-        frequency: int = 100000,
+        frequency: int = I2C_FREQUENCY,
         ot_shutdown: float = 80,
         hysteresis: float = 75,
     ) -> None:
@@ -30,6 +35,9 @@ class DIOTCrateManager:
 
         """
         self.cards = {}
+        # one worker thread per card - it owns the card's FTDI device, so I/O of
+        # a single card is never issued from two threads at the same time
+        self._workers = {}
         if serial_numbers:
             if not all(
                 isinstance(serial, str) and re.match(r"^DT0[0-8]$", serial)
@@ -40,22 +48,33 @@ class DIOTCrateManager:
             serial_numbers = sorted(serial_numbers, key=lambda x: int(x[2:]))
         else:
             logger.info("Serial numbers not provided. Searching for available cards...")
-            discovered = find_serial_numbers()
-            if not discovered:
+            serial_numbers = list(list_diot_cards())
+            if not serial_numbers:
                 logger.warning("No DIOT cards (with DTxx serial numbers) found.")
                 return
-            serial_numbers = sorted(discovered, key=lambda x: int(x[2:]))
 
-        for serial in serial_numbers:
-            self.add_card(serial, frequency, ot_shutdown, hysteresis)
+        # each card is a separate FTDI device, so cards are initialized in parallel;
+        # results are collected in order, so self.cards stays sorted by serial
+        with ThreadPoolExecutor(max_workers=len(serial_numbers)) as executor:
+            cards = list(
+                executor.map(
+                    lambda serial: self._connect_card(
+                        serial, frequency, ot_shutdown, hysteresis
+                    ),
+                    serial_numbers,
+                )
+            )
+        for serial, card in zip(serial_numbers, cards, strict=True):
+            if card is not None:
+                self._register_card(serial, card)
 
-    def add_card(
+    def _connect_card(
         self,
         serial: str,
-        frequency: int = 100000,
+        frequency: int = I2C_FREQUENCY,
         ot_shutdown: float = 80,
         hysteresis: float = 75,
-    ) -> None:
+    ) -> DIOTCard | None:
         try:
             card = DIOTCard(
                 serial=serial,
@@ -63,12 +82,50 @@ class DIOTCrateManager:
                 ot_shutdown=ot_shutdown,
                 hysteresis=hysteresis,
             )
-            self.cards[serial] = card
             logger.info(f"Card {serial} connected successfully")
+            return card
         except (
             Exception
         ) as e:  # TODO: specify only one exception type - probably I2CNACK
             logger.error(f"Failed to connect to card {serial}: {str(e)}", exc_info=True)
+            return None
+
+    def add_card(
+        self,
+        serial: str,
+        frequency: int = I2C_FREQUENCY,
+        ot_shutdown: float = 80,
+        hysteresis: float = 75,
+    ) -> None:
+        card = self._connect_card(serial, frequency, ot_shutdown, hysteresis)
+        if card is not None:
+            self._register_card(serial, card)
+
+    def _register_card(self, serial: str, card: DIOTCard) -> None:
+        self.cards[serial] = card
+        if serial not in self._workers:
+            self._workers[serial] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"diot-{serial}"
+            )
+
+    def close(self) -> None:
+        """Stop worker threads of all cards."""
+        for worker in self._workers.values():
+            worker.shutdown(wait=True)
+        self._workers.clear()
+
+    def run_on_card(
+        self, serial: str, func: Callable[_P, _T], *args: _P.args, **kwargs: _P.kwargs
+    ) -> _T:
+        """Run func in the worker thread of a card and wait for its result.
+
+        All I/O of a card has to go through its worker, so that it is never
+        issued from two threads at the same time. Calls are queued behind the
+        ones already submitted (e.g. a report that is still in flight).
+        """
+        if serial not in self.cards:
+            raise KeyError(f"Card with serial {serial} not found")
+        return self._workers[serial].submit(func, *args, **kwargs).result()
 
     def get_card(self, serial: str) -> DIOTCard:
         """Get a specific card by serial number."""
@@ -82,8 +139,22 @@ class DIOTCrateManager:
 
     def shutdown_all_loads(self) -> None:
         """Turn off all loads on all cards."""
-        for card in self.cards.values():
-            card.shutdown_all_loads()
+        # shutdown is queued in the card workers - after any I/O still in flight
+        # there (e.g. reports interrupted by Ctrl-C), instead of racing it on
+        # the same FTDI device; every card is attempted even if one fails
+        futures = {
+            serial: self._workers[serial].submit(card.shutdown_all_loads)
+            for serial, card in self.cards.items()
+        }
+        error = None
+        for serial, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:  # noqa: BLE001 - re-raised below
+                logger.error(f"Failed to shut down loads of card {serial}: {e}")
+                error = error or e
+        if error is not None:
+            raise error
 
     def _set_single_card_load_power(self, serial: str, power: float):
         if serial not in self.cards:
@@ -115,8 +186,18 @@ class DIOTCrateManager:
 
         logger.debug(f"Setting load power for cards: {serial} to {power}")
 
-        for s, p in zip(serial, power, strict=True):
-            self._set_single_card_load_power(s, p)
+        for s in serial:
+            if s not in self.cards:
+                raise KeyError(f"Card with serial {s} not found")
+
+        # each card is written from its own worker thread (and FTDI device), so
+        # the cards are set concurrently; result() re-raises errors of any card
+        futures = [
+            self._workers[s].submit(self._set_single_card_load_power, s, p)
+            for s, p in zip(serial, power, strict=True)
+        ]
+        for future in futures:
+            future.result()
 
     def _check_steady_state(
         self, card_id: str, elapsed_time: float
@@ -215,6 +296,11 @@ class DIOTCrateManager:
     def report_cards(
         self, shutdown_card_on_ot: bool = True, serials: list[str] | None = None
     ):
+        """Get reports of cards, read concurrently in the cards' worker threads.
+
+        Channels of a single card are still read one after another - they share
+        one I2C bus (and the mux in front of it).
+        """
         # Don't move to numpy yet, as numpy arrays are less efficient for
         # appending data than lists. Even though we theoretically know the
         # number of measurements (duration / interval), we don't know how many
@@ -223,21 +309,24 @@ class DIOTCrateManager:
         # to enumerate the cards and get the measurements, so we the number of
         # measurements is not known in advance.
         # See: https://github.com/numpy/numpy/issues/17090#issuecomment-674421168
-        reports = []
         if serials is None:
             logger.debug("No serial numbers provided. Reporting all cards.")
             serials = self.cards.keys()
             logger.debug(f"Serial numbers: {serials}")
         # it looks like getting report from a single card takes just above 1 seconds
-        # after all it's 18 temp channels and 2 ADCs using I2C over USB
-        for sn in serials:
-            r = self.cards[sn].report()
-            reports.append(r)
+        # after all it's 18 temp channels and 2 ADCs using I2C over USB; each card
+        # is a separate FTDI device, so the cards are read concurrently
+        futures = [self._workers[sn].submit(self.cards[sn].report) for sn in serials]
+        # wait for all cards before re-raising an error of any of them, so no
+        # report is left running behind the caller's back
+        wait(futures)
+        reports = [future.result() for future in futures]
+        for r in reports:
             card_id = r["card_serial"]
-            card_ot_ev = any([ch["ot_ev"] for ch in r["channels"]])
+            card_ot_ev = any(ch.ot_ev for ch in r["channels"])
 
             if shutdown_card_on_ot and card_ot_ev:
                 logger.warning(f"Card {card_id} shutdown due to over-temperature!")
-                self.cards[card_id].shutdown_all_loads()
+                self.run_on_card(card_id, self.cards[card_id].shutdown_all_loads)
 
         return reports
@@ -1,13 +1,15 @@
 import csv
 import datetime
 import logging
+import os
 import time
 from collections import defaultdict, deque
+from collections.abc import Sequence
 from pathlib import Path
 
 from diot.manager import SECONDS_PER_BOARD, DIOTCrateManager
 
-SLEEP_TIME = 0.1  # seconds
+CSV_BUFFER_SIZE = 1 << 16  # bytes, used only when rows are saved at the end
 
 logger = logging.getLogger(__name__)
 
@@ -36,14 +38,21 @@ class MonitoringSession:
         self.file_path = save_dir / f"{session_name}.csv"
 
         self._file_initialized = False
+        # file stays open while monitoring, rows are appended through the writer
+        self._csv_file = None
+        self._csv_writer = None
 
         self.ss_threshold = ss_threshlod
         self.ss_window_duration_s = ss_window_duration * 60
         self.steady_registry = {}
 
+        # rows kept in memory until the end of monitoring; stays empty when
+        # monitor() saves every iteration - the CSV at file_path has the data
         self.measurements = []
 
-    def _initialize_csv(self, fieldnames=None):  # TODO: add fieldnames
+    def _initialize_csv(
+        self, fieldnames: Sequence[str] | None = None, buffering: int = -1
+    ):  # TODO: add fieldnames
         if not self._file_initialized:
             if fieldnames is None:
                 fieldnames = [
@@ -60,32 +69,52 @@ class MonitoringSession:
                     "temp_rate_per_min",
                 ]
 
-            # Newline is recommended for csv:
-            # https://docs.python.org/3/library/csv.html#id4
-            with open(self.file_path, "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
+            self._open_csv("w", fieldnames, buffering)
+            self._csv_writer.writeheader()
             self._file_initialized = True
         else:
             raise RuntimeError(
                 "CSV file already initialized. Aborting so no data is lost."
             )
 
-    def _write_measurements(self, measurements: list[dict]):
+    def _write_measurements(self, measurements: list[dict], flush: bool = False):
         if not measurements:
             logger.info("No measurements to write.")
             return
 
+        # rows flushed every write don't benefit from a large buffer
+        buffering = -1 if flush else CSV_BUFFER_SIZE
+        fieldnames = list(measurements[0])
         if not self._file_initialized:
             logger.debug("Initializing CSV file with headers.")
-            self._initialize_csv(fieldnames=measurements[0].keys())
+            self._initialize_csv(fieldnames=fieldnames, buffering=buffering)
+        elif self._csv_file is None:
+            self._open_csv("a", fieldnames, buffering)
+
+        self._csv_writer.writerows(measurements)
+        if flush:
+            # keep the file on disk current in case the process dies mid-run
+            self._csv_file.flush()
+        logger.debug(f"Wrote {len(measurements)} measurements to CSV {self.file_path}.")
+
+    def _open_csv(self, mode: str, fieldnames: Sequence[str], buffering: int = -1):
+        # Newline is recommended for csv:
+        # https://docs.python.org/3/library/csv.html#id4
+        # The file is kept open across iterations and closed in _close_csv
+        self._csv_file = open(  # noqa: SIM115
+            self.file_path, mode, newline="", buffering=buffering
+        )
+        self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=fieldnames)
 
-        with open(self.file_path, "a", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=measurements[0].keys())
-            writer.writerows(measurements)
-            logger.debug(
-                f"Wrote {len(measurements)} measurements to CSV {self.file_path}."
-            )
+    def _close_csv(self):
+        """Flush buffered rows to disk and close the CSV file."""
+        if self._csv_file is None:
+            return
+        self._csv_file.flush()
+        os.fsync(self._csv_file.fileno())
+        self._csv_file.close()
+        self._csv_file = None
+        self._csv_writer = None
 
     def set_history_buffer(self, n_cards: int):
         """Set the history buffer for steady state detection.
@@ -253,7 +282,7 @@ class MonitoringSession:
     def process_card_report(self, report: dict, elapsed_time: float):
         measurements = []
         card_id = report["card_serial"]
-        card_ot_ev = any([ch["ot_ev"] for ch in report["channels"]])
+        card_ot_ev = any([ch.ot_ev for ch in report["channels"]])
         voltage = report["voltage"]
         current = report["current"]
 
@@ -263,7 +292,7 @@ class MonitoringSession:
 
         for ch_idx, ch_data in enumerate(report["channels"]):
             self._temp_history[card_id][ch_idx].append(
-                (elapsed_time, ch_data["temperature"])
+                (elapsed_time, ch_data.temperature)
             )
             ch_temp_rate, ch_steady_state = self._check_ch_steady_state(
                 card_id, ch_idx, window_start_idx
@@ -275,10 +304,10 @@ class MonitoringSession:
                 "elapsed_time": elapsed_time,
                 "card_serial": card_id,
                 "channel": ch_idx,
-                "temperature": ch_data["temperature"],
-                "load_power": ch_data["load_power"],
-                "ot_shutdown_t": ch_data["ot_shutdown"],
-                "ot_ev": ch_data["ot_ev"],
+                "temperature": ch_data.temperature,
+                "load_power": ch_data.load_power,
+                "ot_shutdown_t": ch_data.ot_shutdown,
+                "ot_ev": ch_data.ot_ev,
                 "voltage": voltage,
                 "current": current,
                 "steady_state": ch_steady_state,
@@ -325,6 +354,8 @@ class MonitoringSession:
             shutdown_at_end (bool): Whether to shut down all loads at the end of monitoring.
                 Default is True.
             save_every_iteration (bool): Whether to save measurements every iteration.
+                If True, rows go straight to the CSV file and are not kept in
+                'measurements', which stays empty; read 'file_path' instead.
                 Default is True.
             serials_to_monitor (list[str]): List of card serials to monitor.
                 If None, all cards available in DIOTCrateManager are monitored.
@@ -358,18 +389,16 @@ class MonitoringSession:
         elapsed_time = 0.0
 
         t0 = time.monotonic()
-        t = t0
-        prev_t = t
+        # samples are scheduled on a fixed grid (t0 + k * interval), so the time
+        # spent reading the cards or oversleeping does not add up to a drift
+        next_t = t0
 
         try:
             while time.monotonic() - t0 < duration:
                 t = time.monotonic()
                 elapsed_time = t - t0 + offset_t
 
-                since_prev_t = t - prev_t
-
-                # prev_t == t0 should be true only for the first iteration
-                if since_prev_t >= interval or prev_t == t0:
+                if t >= next_t:
                     crate_measurements = []
                     reports = self.crate_manager.report_cards(
                         shutdown_card_on_ot, serials_to_monitor
@@ -381,7 +410,10 @@ class MonitoringSession:
                         ot_ev_detected |= card_ot_ev
                         _state_info[report["card_serial"]] = is_card_steady
                         crate_measurements.extend(measurements)
-                    self.measurements.extend(crate_measurements)
+                    # rows saved every iteration are already on disk, keep
+                    # them in memory only when they are written at the end
+                    if not save_every_iteration:
+                        self.measurements.extend(crate_measurements)
 
                     all_steady = all(_state_info.values())
                     if all_steady:
@@ -391,7 +423,7 @@ class MonitoringSession:
                         )
 
                     if save_every_iteration:
-                        self._write_measurements(crate_measurements)
+                        self._write_measurements(crate_measurements, flush=True)
 
                     if ot_ev_detected and stop_on_ot:
                         logger.warning("OT event detected. Stopping monitoring.")
@@ -403,12 +435,15 @@ class MonitoringSession:
                         )
                         break
 
-                    prev_t = t
+                    # if reading took longer than the interval, don't try to
+                    # catch up with a burst of samples - restart the grid
+                    next_t = max(next_t + interval, time.monotonic())
                 else:
-                    time.sleep(min(interval - since_prev_t, SLEEP_TIME))
+                    time.sleep(max(0.0, min(next_t, t0 + duration) - t))
         finally:
             if not save_every_iteration:
                 self._write_measurements(self.measurements)
+            self._close_csv()
 
             if shutdown_at_end:
                 logger.info("Shutting down all loads at the end of monitoring.")
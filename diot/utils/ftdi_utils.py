@@ -1,8 +1,12 @@
+import functools
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import TextIO
 
 from pyftdi.eeprom import FtdiEeprom
 from pyftdi.ftdi import Ftdi
-from pyftdi.misc import hexdump
+from pyftdi.usbtools import UsbDeviceDescriptor, UsbTools
+from usb.core import Device as UsbDevice
 import time
 import logging
 
@@ -15,6 +19,8 @@ CHIP_TYPE = 0x46
 MANUFACTURER = "WUT ISE"
 PRODUCT = "DIOT Tester v1"
 SERIAL = "DT00"
+# written to the start of the EEPROM user area, followed by the slot number
+_USER_PREFIX = b"DT_SLOT_"
 
 default_config = {
     # Bit 4 - CH A driver - if 1 VCP else D2xx
@@ -63,36 +69,46 @@ default_config = {
 }
 
 
-def _default_config(ee, chip_type):
-    chipoff = ee._PROPERTIES[ee.device_version].chipoff
+def _make_patches(config: dict[int, int]) -> tuple[tuple[int, bytes], ...]:
+    """Group a sparse {address: value} config into contiguous (offset, bytes) runs."""
+    patches = []
+    for addr, value in sorted(config.items()):
+        if patches and patches[-1][0] + len(patches[-1][1]) == addr:
+            patches[-1][1].append(value)
+        else:
+            patches.append((addr, bytearray([value])))
+    return tuple((addr, bytes(run)) for addr, run in patches)
+
+
+# default_config as slices to write: ((0x00, b"\x00\x10"), (0x08, b"\xc0\x96\x08"))
+_DEFAULT_CONFIG_PATCHES = _make_patches(default_config)
+
+
+def _default_config(ee: FtdiEeprom, chip_type: int, chipoff: int | None = None) -> None:
+    if chipoff is None:
+        chipoff = ee._PROPERTIES[ee.device_version].chipoff
     ee._eeprom[chipoff] = chip_type
-    for addr, value in default_config.items():
-        ee._eeprom[addr] = value
+    # bytes in between the patches (VID, PID, ...) are kept as they are
+    for offset, patch in _DEFAULT_CONFIG_PATCHES:
+        ee._eeprom[offset : offset + len(patch)] = patch
 
 
 def configure_ftdi(
-    url,
-    manufacturer=MANUFACTURER,
-    product=PRODUCT,
-    serial=SERIAL,
-    force=True,
-    dry_run=True,
-):
-    ft_ee = FtdiEeprom()
-    ft_ee.open(url, model=MODEL)
-    ft_ee._chip = CHIP_TYPE
-    try:
-        if ft_ee.has_serial:
-            logger.warning(f"FTDI has SN already assigned: {ft_ee.serial}")
-            if force:
-                logger.info("Force writing new configuration...")
-            else:
-                logger.info("Aborting...")
-                return
-    except AttributeError:
-        pass
+    url: str | UsbDevice,
+    manufacturer: str = MANUFACTURER,
+    product: str = PRODUCT,
+    serial: str = SERIAL,
+    force: bool = True,
+    dry_run: bool = True,
+    close: bool = True,
+) -> FtdiEeprom | None:
+    # url is either a FTDI URL or an already enumerated pyftdi UsbDevice;
+    # strings are validated before it is opened, so invalid arguments neither
+    # cost USB traffic nor leave the device open
+    # with close=False the EEPROM is left open and returned, so that the caller
+    # can keep using it (e.g. dump it) without opening the device again; it is
+    # then up to the caller to close it
 
-    ft_ee.initialize()
     # funny thing - if strings are more than 29 characters long, pyftdi throws an error
     # that it can't fit strings into EEPROM, and the message says that it's 2 oversize
     # characters... but when it's set to 29 characters, it works fine... (according to pyFTDI,
@@ -108,9 +124,6 @@ def configure_ftdi(
             "Manufacturer + Product + Serial number length exceeds 28 characters"
         )
 
-    _chipoff = ft_ee._PROPERTIES[ft_ee.device_version].chipoff
-    useroff = ft_ee._PROPERTIES[ft_ee.device_version].user
-
     # According to FTDI user guide, the serial number should not start with digit
     # due to the fact that "systems will only recognize the first instance of such
     # a device"
@@ -120,32 +133,82 @@ def configure_ftdi(
     if serial[0].isdigit():
         raise ValueError("Serial number should not start with digit.")
 
+    ft_ee = FtdiEeprom()
+    ft_ee.open(url, model=MODEL)
+    ft_ee._chip = CHIP_TYPE
+    if getattr(ft_ee, "has_serial", False):
+        logger.warning(f"FTDI has SN already assigned: {ft_ee.serial}")
+        if force:
+            logger.info("Force writing new configuration...")
+        else:
+            logger.info("Aborting...")
+            if close:
+                ft_ee.close()
+                return None
+            return ft_ee
+
+    ft_ee.initialize()
+
+    props = ft_ee._PROPERTIES[ft_ee.device_version]
+    chipoff = props.chipoff
+    useroff = props.user
+
     ft_ee.set_manufacturer_name(manufacturer)
     ft_ee.set_product_name(product)
     ft_ee.set_serial_number(serial)
 
-    _default_config(ft_ee, ft_ee._chip)
+    _default_config(ft_ee, ft_ee._chip, chipoff)
 
     # FIXME: let's assume that the serial number is in format DTxx, where xx is
     # a number from 0 to 99 (more likely 0 to 9 for DIOT Tester crate) and denotes
     # the slot number the device is in.
-    bstream = bytearray()
-    bstream.extend(f"DT_SLOT_{serial[-2:]}\0".encode("utf-8"))
-    ft_ee._eeprom[useroff : useroff + len(bstream)] = bstream
+    blob = _USER_PREFIX + serial[-2:].encode("ascii") + b"\0"
+    ft_ee._eeprom[useroff : useroff + len(blob)] = blob
 
     ft_ee._dirty.add("eeprom")
+    # commit() syncs (checksum) the EEPROM image itself before writing it
     ft_ee.commit(dry_run=dry_run)
-    ft_ee.sync()
-    ft_ee.close()
-
-
-def dump_ee_contents(url="ftdi://ftdi:232h:/1", serial=None, file=None):
-    if serial is not None:
-        url = f"ftdi://::{serial}/1"
-    ft_ee = FtdiEeprom()
-    ft_ee.open(url, model=MODEL)
-    print(hexdump(ft_ee.data, full=True), file=file or sys.stdout)
-    ft_ee.close()
+    if close:
+        ft_ee.close()
+        return None
+    return ft_ee
+
+
+# printable ASCII is shown as is, everything else as '.'
+_HEXDUMP_ASCII = bytes(x if 0x20 <= x < 0x7F else ord(".") for x in range(0x100))
+
+
+def _hexdump(data: bytes | bytearray) -> str:
+    # same layout as pyftdi's hexdump(full=True): offset, 2 x 8 bytes, ASCII
+    mv = memoryview(data)
+    lines = []
+    for offset in range(0, len(mv), 16):
+        row = mv[offset : offset + 16]
+        hexa = row.hex(" ")
+        ascii_ = bytes(row).translate(_HEXDUMP_ASCII).decode("ascii")
+        lines.append(f"{offset:08x}  {hexa[:23]:<23}  {hexa[24:]:<23}  |{ascii_}|")
+    return "\n".join(lines)
+
+
+def dump_ee_contents(
+    url: str | UsbDevice = "ftdi://ftdi:232h:/1",
+    serial: str | None = None,
+    file: TextIO | None = None,
+    ee: FtdiEeprom | None = None,
+) -> None:
+    # an already open FtdiEeprom can be passed as ee - it is dumped as is and
+    # left open, otherwise the device is opened from url/serial and closed
+    close_it = ee is None
+    if close_it:
+        if serial is not None:
+            url = f"ftdi://::{serial}/1"
+        ee = FtdiEeprom()
+        ee.open(url, model=MODEL)
+    try:
+        print(_hexdump(ee.data), file=file or sys.stdout)
+    finally:
+        if close_it:
+            ee.close()
 
 
 def find_devices(url="ftdi://ftdi:232h:/1"):
@@ -160,37 +223,88 @@ def find_devices(url="ftdi://ftdi:232h:/1"):
 
 def find_serial_numbers(url="ftdi://ftdi:232h:/1"):
     serials = []
+    # device report is built only if it is going to be logged, and then it is
+    # emitted as a single record instead of two per device
+    report = [] if logger.isEnabledFor(logging.DEBUG) else None
     devices = Ftdi.list_devices(url)
     for dev in devices:
         vid, pid, bus, address, sn, _, desc = dev[0]
-        logger.debug(f"Found device: {dev}")
-        logger.debug(f"VID:PID: {vid:04X}:{pid:04X}, Bus: {bus}, Address: {address}, Serial: {sn}, Desc: {desc}")
+        if report is not None:
+            report.append(f"Found device: {dev}")
+            report.append(
+                f"VID:PID: {vid:04X}:{pid:04X}, Bus: {bus}, Address: {address}, "
+                f"Serial: {sn}, Desc: {desc}"
+            )
         if sn:
             serials.append(sn)
+    if report:
+        logger.debug("\n".join(report))
     return serials
 
 
-def configure_all_ftdis(force=True, dry_run=True, dump=False):
-    devices = find_devices()
-    for ix, dev in enumerate(devices):
-        vid, pid, bus, address = dev
-        if vid != 0x0403 or pid != 0x6014:
+@functools.lru_cache(maxsize=1)
+def list_diot_cards(url="ftdi://ftdi:232h:/1"):
+    """Return serial numbers of connected DIOT cards, sorted by slot.
+
+    USB enumeration is done only once; call `list_diot_cards.cache_clear()`
+    to rescan the bus.
+    """
+    serials = [sn for sn in find_serial_numbers(url) if sn.startswith("DT")]
+    return tuple(sorted(serials, key=lambda x: int(x[2:])))
+
+
+def configure_all_ftdis(
+    force: bool = True, dry_run: bool = True, dump: bool = False
+) -> None:
+    # devices are opened straight from the enumerated descriptors - building an
+    # URL for each of them would make pyftdi look the device up on the bus again
+    devices = [desc for desc, _ in Ftdi.list_devices("ftdi://ftdi:232h:/1")]
+    to_configure = []
+    for ix, desc in enumerate(devices):
+        if desc.vid != 0x0403 or desc.pid != 0x6014:
+            dev = (desc.vid, desc.pid, desc.bus, desc.address)
             logger.debug(f"Device: {dev} is not FTDI FT232H. Skipping...")
             continue
-        url = f"ftdi://:232h:{bus:x}:{address:x}/1"
-        new_serial = f"DT{ix:02d}"
+        to_configure.append((desc, f"DT{ix:02d}"))
+    if not to_configure:
+        return
+
+    def configure_one(desc: UsbDeviceDescriptor, new_serial: str) -> FtdiEeprom | None:
+        dev = (desc.vid, desc.pid, desc.bus, desc.address)
         logger.warning(f"Configuring device {dev} with new serial: {new_serial}")
-        configure_ftdi(
-            url=url,
+        # when dumping, the EEPROM is kept open so it's not opened a second time
+        return configure_ftdi(
+            url=UsbTools.get_device(desc),
             manufacturer=MANUFACTURER,
             product=PRODUCT,
             serial=new_serial,
             force=force,
             dry_run=dry_run,
+            close=not dump,
         )
+
+    # each device has its own USB handle, so they are configured concurrently;
+    # leaving the executor waits for all of them, so EEPROMs left open by the
+    # devices that succeeded are closed below even if another one failed
+    with ThreadPoolExecutor(max_workers=min(8, len(to_configure))) as executor:
+        futures = [executor.submit(configure_one, *args) for args in to_configure]
+    eeproms = [f.result() if f.exception() is None else None for f in futures]
+
+    try:
+        # re-raise the first error
+        for future in futures:
+            future.result()
+
+        # dumps are printed afterwards, one device after another, so they don't mix
         if dump:
-            print(f"Dumping EEPROM contents for device {dev}")
-            dump_ee_contents(url=url)
+            for (desc, _), ft_ee in zip(to_configure, eeproms, strict=True):
+                dev = (desc.vid, desc.pid, desc.bus, desc.address)
+                print(f"Dumping EEPROM contents for device {dev}")
+                dump_ee_contents(ee=ft_ee)
+    finally:
+        for ft_ee in eeproms:
+            if ft_ee is not None:
+                ft_ee.close()
 
 
 if __name__ == "__main__":
@@ -1,30 +1,57 @@
+from collections.abc import Iterable
+
 from adafruit_blinka.microcontroller.ftdi_mpsse.mpsse.i2c import I2C as _I2C
 
+# 7-bit addresses outside of this range are reserved by I2C specification
+I2C_FIRST_ADDR = 0x08
+I2C_LAST_ADDR = 0x77
+# graph keeps showing 0x03-0x07 as empty cells, even though they are not polled
+_I2C_GRAPH_FIRST_ADDR = 0x03
+
 
 # patching ftdi_mpsse.mpsse.i2c.I2C.scan method so it accepts one argument
-def patched_scan_method(self, write=False):
-    return [addr for addr in range(0x78) if self._i2c.poll(addr, write)]
+# (and optionally addresses to poll instead of the whole range)
+def patched_scan_method(
+    self, write: bool = False, addresses: Iterable[int] | None = None
+) -> list[int]:
+    if addresses is None:
+        addresses = range(I2C_FIRST_ADDR, I2C_LAST_ADDR + 1)
+    return [addr for addr in addresses if self._i2c.poll(addr, write)]
 
 
-_I2C.scan = patched_scan_method
+patched_scan_method._patched = True
 
 
-def make_i2c_graph(detected):
-    first = 0x03
-    last = 0x77
-    header = "    " + " ".join([f"{x:2x}" for x in range(0x00, 0x10)])
-    buffer = header
+def _install_scan_patch():
+    # patch may be installed from more than one module - do it only once
+    if not getattr(_I2C.scan, "_patched", False):
+        _I2C.scan = patched_scan_method
+
+
+_install_scan_patch()
 
+
+_I2C_GRAPH_HEADER = "    " + " ".join([f"{x:2x}" for x in range(0x00, 0x10)])
+_I2C_GRAPH_CELLS = tuple(f"{addr:02x}" for addr in range(0x80))
+
+
+def make_i2c_graph(detected):
+    first = _I2C_GRAPH_FIRST_ADDR
+    last = I2C_LAST_ADDR
+    detected = frozenset(detected)
+
+    # addresses outside of [first, last] range are reserved and are left blank
+    addr_status = (
+        ["  "] * first
+        + [
+            _I2C_GRAPH_CELLS[addr] if addr in detected else "--"
+            for addr in range(first, last + 1)
+        ]
+        + ["  "] * (0x7F - last)
+    )
+    lines = [_I2C_GRAPH_HEADER]
     for line_ix in range(0, 0x80, 0x10):
-        line_contents = []
-        for addr in range(line_ix, line_ix + 0x10):
-            if addr < first or addr > last:
-                line_contents.append("  ")
-            elif addr in detected:
-                line_contents.append(f"{addr:02x}")
-            else:
-                line_contents.append("--")
-        line = " ".join(line_contents)
-        buffer += f"\n{line_ix:02x}: {line}"
-
-    return buffer
+        line = " ".join(addr_status[line_ix : line_ix + 0x10])
+        lines.append(f"{line_ix:02x}: {line}")
+
+    return "\n".join(lines)
@@ -1,9 +1,12 @@
 import argparse
 import logging
+import sys
+from collections.abc import Callable
 from pathlib import Path
 
-from diot import DIOTCrateManager, MonitoringSession
-from diot.utils.ftdi_utils import find_serial_numbers
+from diot import DIOTCard, DIOTCrateManager, MonitoringSession
+from diot.cards import I2C_FREQUENCY
+from diot.utils.ftdi_utils import list_diot_cards
 
 DEFAULT_START_CARD = 0
 DEFAULT_N_CARDS = 9
@@ -17,6 +20,7 @@ DEFAULT_RESULTS_DIR = "results"
 
 
 def setup_logging(debug: bool = False, name: str | None = None) -> logging.Logger:
+    """Set up logging to the console and to '<name>.log' file."""
     console_level = logging.DEBUG if debug else logging.INFO
     logger = logging.getLogger()
     if name is None:
@@ -51,7 +55,8 @@ def setup_logging(debug: bool = False, name: str | None = None) -> logging.Logge
 
 
 def list_available_cards():
-    serial_numbers = sorted(find_serial_numbers(), key=lambda x: int(x[2:]))
+    """Print and return serial numbers of connected DIOT cards."""
+    serial_numbers = list(list_diot_cards())
     if not serial_numbers:
         return []
 
@@ -62,6 +67,7 @@ def list_available_cards():
 
 
 def query_card_status(crate_manager: DIOTCrateManager, card_serial: str | None = None):
+    """Print voltage, current and channel temperatures of the cards."""
     cards = {}
     if card_serial:
         if card_serial not in crate_manager.cards:
@@ -71,24 +77,35 @@ def query_card_status(crate_manager: DIOTCrateManager, card_serial: str | None =
     else:
         cards = crate_manager.get_all_cards()
 
+    # status is collected into a single buffer and written at once, instead of
+    # issuing a separate print() for each value; cards are read in their worker
+    # threads (see DIOTCrateManager.run_on_card)
+    out = []
     for serial, card in cards.items():
-        print(f"Card {serial}:")
-        print(f"Voltage: {card.voltage:.2f} V")
-        print(f"Current: {card.current:.2f} A")
-        print("Temperatures:")
-
-        # Last channel one on the card is the 3V3 load channel, so skip it
-        for i, channel in enumerate(card.load_channels[:-1]):
-            if i % 4 == 0 and i > 0:
-                print()
-            print(
-                f"CH{i}: {channel.temperature:.1f}°C ({channel.load_power:.2f}W) ",
-                end="",
-            )
-        print("\n")
+        out.extend(crate_manager.run_on_card(serial, _card_status, serial, card))
+    sys.stdout.write("".join(out))
+    sys.stdout.flush()
+
+
+def _card_status(serial: str, card: DIOTCard) -> list[str]:
+    out = [
+        f"Card {serial}:\n",
+        f"Voltage: {card.voltage:.2f} V\n",
+        f"Current: {card.current:.2f} A\n",
+        "Temperatures:\n",
+    ]
+
+    # Last channel one on the card is the 3V3 load channel, so skip it
+    for i, channel in enumerate(card.load_channels[:-1]):
+        if i % 4 == 0 and i > 0:
+            out.append("\n")
+        out.append(f"CH{i}: {channel.temperature:.1f}°C ({channel.load_power:.2f}W) ")
+    out.append("\n\n")
+    return out
 
 
 def monitor_cards(crate_manager: DIOTCrateManager, args: argparse.Namespace):
+    """Set load power of the cards and run the monitoring session(s)."""
     logger = logging.getLogger("monitor_app")
     duration = args.duration * 60  # Convert minutes to seconds
 
@@ -165,6 +182,7 @@ def monitor_cards(crate_manager: DIOTCrateManager, args: argparse.Namespace):
 
 
 def get_parser():
+    """Create the command line parser."""
     parser = argparse.ArgumentParser(description="DIOT Crate Monitoring Tool")
     subparsers = parser.add_subparsers(dest="command")
 
@@ -172,10 +190,18 @@ def get_parser():
     parent_parser.add_argument(
         "--debug", action="store_true", help="Enable debug logging"
     )
+    parent_parser.add_argument(
+        "--i2c-frequency",
+        type=int,
+        default=I2C_FREQUENCY,
+        help=f"I2C bus frequency in Hz (default: {I2C_FREQUENCY}); "
+        "use 100000 if the bus is unreliable in Fast Mode",
+    )
 
-    _list_parser = subparsers.add_parser(
+    list_parser = subparsers.add_parser(
         "list", parents=[parent_parser], help="List available DIOT cards"
     )
+    list_parser.set_defaults(func=run_list)
 
     status_parser = subparsers.add_parser(
         "status", parents=[parent_parser], help="Query status of DIOT cards"
@@ -183,10 +209,12 @@ def get_parser():
     status_parser.add_argument(
         "--card", type=str, help="Serial number of the card to query", default=None
     )
+    status_parser.set_defaults(func=_crate_command(run_status))
 
     monitor_parser = subparsers.add_parser(
         "monitor", parents=[parent_parser], help="Start monitoring session"
     )
+    monitor_parser.set_defaults(func=_crate_command(monitor_cards))
     monitor_parser.add_argument(
         "--start-card",
         type=int,
@@ -274,15 +302,118 @@ def get_parser():
         "--channel", help="Channel number (omit to set on all channels)"
     )
     set_load_power_parser.add_argument("power", type=float, help="Load power in W")
+    set_load_power_parser.set_defaults(func=_crate_command(run_set_load_power))
 
-    _shutdown_parser = subparsers.add_parser(
+    shutdown_parser = subparsers.add_parser(
         "shutdown", parents=[parent_parser], help="Shutdown all cards"
     )
+    shutdown_parser.set_defaults(func=_crate_command(run_shutdown))
+
+    i2c_tree_parser = subparsers.add_parser(
+        "i2c-tree", parents=[parent_parser], help="Print I2C device tree of cards"
+    )
+    i2c_tree_parser.add_argument(
+        "--card", type=str, help="Serial number of the card to scan", default=None
+    )
+    i2c_tree_parser.add_argument(
+        "--full-scan",
+        action="store_true",
+        help="Poll the whole I2C address range instead of known DIOT card devices",
+    )
+    i2c_tree_parser.set_defaults(func=_crate_command(run_i2c_tree))
 
     return parser
 
 
+def _crate_command(
+    handler: Callable[[DIOTCrateManager, argparse.Namespace], None],
+) -> Callable[[argparse.Namespace], None]:
+    """Wrap a command handler to run on a crate manager of all connected cards."""
+
+    def run(args: argparse.Namespace) -> None:
+        available_cards = list_available_cards()
+        if not available_cards:
+            logging.getLogger("monitor_app").error("No DIOT cards found.")
+            return
+
+        crate_manager = DIOTCrateManager(
+            serial_numbers=available_cards,
+            frequency=args.i2c_frequency,
+            ot_shutdown=getattr(args, "ot_shutdown", DEFAULT_OT_SHUTDOWN),
+            hysteresis=getattr(args, "hysteresis", DEFAULT_HYSTERESIS),
+        )
+        try:
+            handler(crate_manager, args)
+        finally:
+            crate_manager.close()
+
+    return run
+
+
+def run_list(args: argparse.Namespace):
+    """Handle the 'list' command, without opening any FTDI device."""
+    if not list_available_cards():
+        logging.getLogger("monitor_app").info("No DIOT cards found.")
+
+
+def run_status(crate_manager: DIOTCrateManager, args: argparse.Namespace):
+    """Handle the 'status' command."""
+    logger = logging.getLogger("monitor_app")
+    logger.info("Querying status of DIOT cards...")
+    query_card_status(crate_manager, args.card)
+
+
+def run_set_load_power(crate_manager: DIOTCrateManager, args: argparse.Namespace):
+    """Handle the 'set-load-power' command."""
+    logger = logging.getLogger("monitor_app")
+    try:
+        card = crate_manager.get_card(args.card)
+        if args.channel is not None:
+            # Load power ONLY for a specific channel
+            channel = int(args.channel)
+            if channel < 0 or channel >= len(card.load_channels):
+                logger.error(f"Invalid channel number {channel}.")
+                return
+            crate_manager.run_on_card(
+                args.card,
+                setattr,
+                card.load_channels[channel],
+                "load_power",
+                args.power,
+            )
+            logger.info(
+                f"Set load power of card {args.card} channel {channel} to {args.power} W"
+            )
+        else:
+            # Load power for EACH channel on the card
+            crate_manager.run_on_card(args.card, card.set_all_load_power, args.power)
+            logger.info(f"Set card {args.card} channels power to {args.power} W")
+    except Exception as e:
+        logger.error(f"Error setting load power: {e}")
+
+
+def run_i2c_tree(crate_manager: DIOTCrateManager, args: argparse.Namespace):
+    """Handle the 'i2c-tree' command."""
+    cards = (
+        {args.card: crate_manager.get_card(args.card)}
+        if args.card
+        else crate_manager.get_all_cards()
+    )
+    for serial, card in cards.items():
+        print(f"Card {serial}:")
+        crate_manager.run_on_card(serial, card.print_i2c_tree, full_scan=args.full_scan)
+
+
+def run_shutdown(crate_manager: DIOTCrateManager, args: argparse.Namespace):
+    """Handle the 'shutdown' command."""
+    logger = logging.getLogger("monitor_app")
+    logger.info("Shutting down all cards...")
+    crate_manager.shutdown_all_loads()
+    logger.info("All cards shut down.")
+
+
 def main():
+    """Run the DIOT monitoring tool."""
     parser = get_parser()
     args = parser.parse_args()
 
@@ -295,59 +426,7 @@ def main():
         parser.print_help()
         return
 
-    if args.command == "list":
-        list_available_cards()
-        return
-
-    available_cards = list_available_cards()
-    if not available_cards:
-        logger.error("No DIOT cards found.")
-        return
-
-    if args.command == "monitor":
-        crate_manager = DIOTCrateManager(
-            serial_numbers=available_cards,
-            ot_shutdown=args.ot_shutdown,
-            hysteresis=args.hysteresis,
-        )
-    else:
-        crate_manager = DIOTCrateManager(
-            serial_numbers=available_cards,
-            ot_shutdown=DEFAULT_OT_SHUTDOWN,
-            hysteresis=DEFAULT_HYSTERESIS,
-        )
-
-    if args.command == "status":
-        logger.info("Querying status of DIOT cards...")
-        query_card_status(crate_manager, args.card)
-
-    elif args.command == "monitor":
-        monitor_cards(crate_manager, args)
-
-    elif args.command == "set-load-power":
-        try:
-            card = crate_manager.get_card(args.card)
-            if args.channel is not None:
-                # Load power ONLY for a specific channel
-                channel = int(args.channel)
-                if channel < 0 or channel >= len(card.load_channels):
-                    logger.error(f"Invalid channel number {channel}.")
-                    return
-                card.load_channels[channel].load_power = args.power
-                logger.info(
-                    f"Set load power of card {args.card} channel {channel} to {args.power} W"
-                )
-            else:
-                # Load power for EACH channel on the card
-                card.set_all_load_power(args.power)
-                logger.info(f"Set card {args.card} channels power to {args.power} W")
-        except Exception as e:
-            logger.error(f"Error setting load power: {e}")
-
-    elif args.command == "shutdown":
-        logger.info("Shutting down all cards...")
-        crate_manager.shutdown_all_loads()
-        logger.info("All cards shut down.")
+    args.func(args)
 
 
 if __name__ == "__main__":
@@ -12,9 +12,13 @@ For NGL202 with:
 
 import argparse
 import logging
+import socket
 import time
+from collections.abc import Iterable
 
 import pyvisa
+from pyvisa.constants import EventMechanism, EventType, StatusCode
+from pyvisa.errors import VisaIOError
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +27,15 @@ MIN_V = 0
 MAX_I = 6  # if voltage is in range 0-6V, otherwise 3
 MIN_I = 0.010
 
+VISA_CHUNK_SIZE = 1024 * 1024  # bytes
+
+# Encoded, terminated templates of the set commands, filled in with bytes %-format
+_CMD_NSEL = b"INST:NSEL %d\n"
+_CMD_VOLT = b"SOUR:VOLT %.6f\n"
+_CMD_CURR = b"SOUR:CURR %.6f\n"
+_CMD_APPL = b"APPL %.6f,%.6f,OUT%d\n"
+_CMD_OVP = b"VOLT:PROT %s;:VOLT:PROT:LEV %.6f\n"
+
 
 class RSPowerSupply:
     """
@@ -32,6 +45,9 @@ class RSPowerSupply:
     similar R&S power supplies that support standard SCPI commands.
     """
 
+    # Shared between instances so that reconnecting skips VISA backend discovery
+    _resource_manager = None
+
     def __init__(self, address, timeout_s=5):
         """
         Initialize the power supply connection.
@@ -44,18 +60,27 @@ class RSPowerSupply:
         self.address = address
         self.timeout = timeout_s * 1000
         self.instrument = None
+        # Host-side shadows of the set voltage/current, keyed by channel
+        self._channel = None
+        self._v_set = {}
+        self._i_set = {}
         self.connect()
 
     def connect(self):
         """Establish connection to the power supply."""
-        rm = pyvisa.ResourceManager()
+        if RSPowerSupply._resource_manager is None:
+            RSPowerSupply._resource_manager = pyvisa.ResourceManager()
+        rm = RSPowerSupply._resource_manager
+        self._invalidate_setpoints()
         try:
             self.instrument = rm.open_resource(
                 f"TCPIP::{self.address}::INSTR",
             )
             self.instrument.timeout = self.timeout
+            self.instrument.chunk_size = VISA_CHUNK_SIZE
+            self._set_tcp_nodelay()
             idn = self.idn().strip("\n")
-            logger.info(f"Connected to: {idn}")
+            logger.info("Connected to: %s", idn)
 
             # Check if it's an R&S power supply
             if "Rohde&Schwarz" not in idn:
@@ -63,9 +88,30 @@ class RSPowerSupply:
                     "Connected device may not be a Rohde & Schwarz power supply"
                 )
         except Exception as e:
-            logger.error(f"Connection failed: {e}", exc_info=True)
+            logger.error("Connection failed: %s", e, exc_info=True)
             raise e
 
+    def _set_tcp_nodelay(self):
+        """Disable Nagle's algorithm on the instrument socket.
+
+        SCPI traffic consists of short request/response messages, which Nagle's
+        algorithm can hold back for tens of ms. Only the pyvisa-py backend
+        exposes its socket; other backends are left untouched.
+        """
+        sessions = getattr(self.instrument.visalib, "sessions", None)
+        session = sessions.get(self.instrument.session) if sessions else None
+        interface = getattr(session, "interface", None)
+        # VXI-11 (INSTR) wraps the socket in an RPC client, raw SOCKET does not
+        sock = (
+            interface
+            if isinstance(interface, socket.socket)
+            else getattr(interface, "sock", None)
+        )
+        if isinstance(sock, socket.socket):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            logger.debug("VISA backend socket not accessible, TCP_NODELAY not set")
+
     def disconnect(self):
         """Close the connection to the power supply."""
         if self.instrument:
@@ -84,9 +130,58 @@ class RSPowerSupply:
     def cmd(self, cmd):
         self.instrument.write(cmd)
 
+    def cmd_raw(self, cmd: bytes) -> None:
+        """Send an already encoded, newline terminated command.
+
+        Args:
+            cmd (bytes): Command to write as is, including the line terminator
+        """
+        self.instrument.write_raw(cmd)
+
+    @staticmethod
+    def _chain(commands: Iterable[str]) -> str:
+        """Join SCPI commands into a single program message.
+
+        Every command after the first one is prefixed with ':' (unless it is
+        a common '*' command) so the header path is reset to the root.
+        """
+        return ";".join(
+            c if i == 0 or c.startswith((":", "*")) else f":{c}"
+            for i, c in enumerate(commands)
+        )
+
+    def cmd_many(self, *cmds: str) -> None:
+        """Send several commands in a single write.
+
+        Args:
+            *cmds (str): SCPI commands, chained with ';' into one message
+        """
+        self.cmd(self._chain(cmds))
+
     def query(self, command):
         return self.instrument.query(command)
 
+    def _query_int(self, command: str) -> int:
+        # int() parses the raw ASCII response, no str decoding needed
+        self.instrument.write(command)
+        return int(self.instrument.read_raw())
+
+    def _query_float(self, command: str) -> float:
+        self.instrument.write(command)
+        return float(self.instrument.read_raw())
+
+    def query_many(self, *queries: str) -> list[str]:
+        """Send several queries in a single request and split the responses.
+
+        Args:
+            *queries (str): SCPI queries, chained with ';' into one message
+
+        Returns:
+            list[str]: Stripped responses, in the order of the queries
+        """
+        response = self.query(self._chain(queries))
+        return [r.strip() for r in response.split(";")]
+
     def idn(self):
         """Get the identification string of the power supply."""
         return self.query("*IDN?")
@@ -94,6 +189,12 @@ class RSPowerSupply:
     def reset(self):
         """Reset the power supply to default settings."""
         self.cmd("*RST")
+        self._invalidate_setpoints()
+
+    def _invalidate_setpoints(self):
+        self._channel = None
+        self._v_set.clear()
+        self._i_set.clear()
 
     def clear_status(self):
         self.cmd("*CLS")
@@ -102,56 +203,146 @@ class RSPowerSupply:
         return self.query("*OPC?")
 
     def wait_for_opc(self, timeout=5):
+        """Wait until all pending operations are complete.
+
+        The OPC bit is routed to a service request so the wait blocks in VISA
+        instead of polling the instrument. Backends without SRQ support fall
+        back to polling '*OPC?' with exponential backoff.
+        """
+        # OPC -> ESB (ESE bit 0) -> SRQ (SRE bit 5). Reading '*ESR?' clears a
+        # stale OPC bit without wiping the error queue like '*CLS' would.
+        self._query_int("*ESR?")
+        self.cmd_many("*ESE 1", "*SRE 32")
+        try:
+            try:
+                self.instrument.enable_event(
+                    EventType.service_request, EventMechanism.queue
+                )
+            except (NotImplementedError, VisaIOError) as e:
+                logger.debug("SRQ not supported (%s), polling *OPC?", e)
+                self._poll_opc(timeout)
+                return
+
+            try:
+                self.cmd("*OPC")
+                self.instrument.wait_on_event(
+                    EventType.service_request, int(timeout * 1000)
+                )
+            except VisaIOError as e:
+                if e.error_code == StatusCode.error_timeout:
+                    raise TimeoutError("Operation timed out") from e
+                raise
+            finally:
+                self.instrument.disable_event(
+                    EventType.service_request, EventMechanism.queue
+                )
+            # Serial poll releases the request line
+            self.instrument.read_stb()
+        finally:
+            # Stop raising requests and clear ESR so the next '*OPC' starts clean
+            self.cmd_many("*SRE 0", "*ESE 0")
+            self._query_int("*ESR?")
+
+    def _poll_opc(self, timeout: float = 5) -> None:
         t = time.monotonic()
-        while int(self.query_opc()) != 1:
+        delay = 0.01
+        while self._query_int("*OPC?") != 1:
             if time.monotonic() - t > timeout:
                 raise TimeoutError("Operation timed out")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
 
     # ==========================================================================
     def select_channel(self, channel=1):
         """Select the channel for subsequent commands."""
         if channel not in [1, 2]:
             raise ValueError("Channel must be 1 or 2")
-        self.cmd(f"INST:NSEL {channel}")
+        self.cmd_raw(_CMD_NSEL % channel)
+        self._channel = channel
 
     def query_channel(self):
         """Query the currently selected channel."""
-        return int(self.query("INST:NSEL?"))
+        return self._query_int("INST:NSEL?")
 
     # Channel-specific methods
     def set_voltage(self, voltage):
         """Set the voltage"""
         if voltage > MAX_V or voltage < MIN_V:
             raise ValueError(f"Voltage must be between {MIN_V} and {MAX_V} V")
-        self.cmd(f"SOUR:VOLT {voltage}")
+        self.cmd_raw(_CMD_VOLT % voltage)
+        if self._channel is not None:
+            self._v_set[self._channel] = float(voltage)
+
+    def get_voltage(self, use_cache: bool = True) -> float:
+        """Get the set voltage.
 
-    def get_voltage(self):
-        """Query the voltage."""
-        return float(self.query("SOUR:VOLT?"))
+        Args:
+            use_cache (bool): Return the last value written from this host
+                if known; pass False to always query the device.
+        """
+        if use_cache and self._channel in self._v_set:
+            return self._v_set[self._channel]
+        voltage = self._query_float("SOUR:VOLT?")
+        if self._channel is not None:
+            self._v_set[self._channel] = voltage
+        return voltage
 
     def measure_voltage(self):
-        cmd = "MEAS:VOLT?"
-        return float(self.query(cmd))
+        return self._query_float("MEAS:VOLT?")
 
     def set_current(self, current):
         """Set the current limit"""
         if current > MAX_I or current < MIN_I:
             raise ValueError(f"Current must be between {MIN_I} and {MAX_I} A")
-        self.cmd(f"SOUR:CURR {current}")
+        self.cmd_raw(_CMD_CURR % current)
+        if self._channel is not None:
+            self._i_set[self._channel] = float(current)
 
-    def get_current(self, channel=1):
-        """Get the set current."""
-        return float(self.query("SOUR:CURR?"))
+    def get_current(self, channel: int | None = None, use_cache: bool = True) -> float:
+        """Get the set current.
+
+        Args:
+            channel (int | None): Channel to get the current of; it is selected
+                first if it is not the current one. None means the currently
+                selected channel.
+            use_cache (bool): Return the last value written from this host
+                if known; pass False to always query the device.
+        """
+        if use_cache and channel is not None and channel in self._i_set:
+            return self._i_set[channel]
+        if channel is not None and channel != self._channel:
+            self.select_channel(channel)
+        if use_cache and self._channel in self._i_set:
+            return self._i_set[self._channel]
+        current = self._query_float("SOUR:CURR?")
+        if self._channel is not None:
+            self._i_set[self._channel] = current
+        return current
 
     def measure_current(self):
-        cmd = "MEAS:CURR?"
-        return float(self.query(cmd))
+        return self._query_float("MEAS:CURR?")
 
     def measure(self):
         """Measure voltage and current."""
-        voltage = self.measure_voltage()
-        current = self.measure_current()
-        return voltage, current
+        voltage, current = self.query_many("MEAS:VOLT?", "MEAS:CURR?")
+        return float(voltage), float(current)
+
+    def measure_all(self):
+        """Measure voltage and current of both channels in a single request.
+
+        Returns:
+            list: (voltage, current) tuples for channel 1 and 2
+        """
+        queries = []
+        for channel in (1, 2):
+            queries += [f"INST:NSEL {channel}", "MEAS:VOLT?", "MEAS:CURR?"]
+        # Restore the selection so subsequent commands hit the same channel
+        if self._channel is not None:
+            queries.append(f"INST:NSEL {self._channel}")
+        values = self.instrument.query_ascii_values(self._chain(queries), separator=";")
+        if self._channel is None:
+            self._channel = 2
+        return [(values[0], values[1]), (values[2], values[3])]
 
     def set_channel(self, voltage, current, channel=1):
         """Set voltage and current for a specific channel."""
@@ -161,31 +352,43 @@ class RSPowerSupply:
             raise ValueError(f"Voltage must be between {MIN_V} and {MAX_V} V")
         if current > MAX_I or current < MIN_I:
             raise ValueError(f"Current must be between {MIN_I} and {MAX_I} A")
-        self.cmd(f"APPL {voltage},{current},OUT{channel}")
+        self.cmd_raw(_CMD_APPL % (voltage, current, channel))
+        self._v_set[channel] = float(voltage)
+        self._i_set[channel] = float(current)
 
     # ===================================================================
     def set_output_state(self, enable=True):
         """Turn on the output."""
         state = "1" if enable else "0"
-        self.cmd(f"OUTP:SEL {state}")
-        self.cmd(f"OUTP {state}")
+        self.cmd_many(f"OUTP:SEL {state}", f"OUTP {state}")
 
     def get_output_state(self):
         """Get the output state for a specific channel."""
         response = self.query("OUTP?")
-        logger.debug(f"OUTP? response: {int(response)}")
-        return int(response) == 1 or response.lower() == "on"
+        logger.debug("OUTP? response: %s", response)
+        return self.parse_output_state(response)
+
+    @staticmethod
+    def parse_output_state(response: str) -> bool:
+        """Tell whether an 'OUTP?' response means that the output is on.
+
+        Args:
+            response (str): Response to 'OUTP?', either '1'/'0' or 'ON'/'OFF'
+        """
+        response = response.strip()
+        if response.isdigit():
+            return int(response) == 1
+        return response.upper() == "ON"
 
     def set_ovp(self, voltage_lvl, enable=True):
         """Set overvoltage protection threshold."""
-        self.set_ovp_state(enable)
-        self.cmd(f"VOLT:PROT:LEV {voltage_lvl}")
+        state = b"ON" if enable else b"OFF"
+        self.cmd_raw(_CMD_OVP % (state, voltage_lvl))
 
     def get_ovp(self, channel=1):
         """Get overvoltage protection threshold."""
-        state = int(self.query("VOLT:PROT?"))
-        lvl = float(self.query("VOLT:PROT:LEV?"))
-        return state, lvl
+        state, lvl = self.query_many("VOLT:PROT?", "VOLT:PROT:LEV?")
+        return int(state), float(lvl)
 
     def set_ovp_state(self, enable=True):
         """Enable overvoltage protection."""
@@ -244,41 +447,43 @@ def main():
 
         # Select channel
         psu.select_channel(args.channel)
-        logger.debug(f"Selected channel: {args.channel}")
+        logger.debug("Selected channel: %s", args.channel)
 
         # Set voltage if specified
         if args.voltage is not None:
             psu.set_voltage(args.voltage)
-            logger.debug(f"Voltage set to {args.voltage} V")
+            logger.debug("Voltage set to %s V", args.voltage)
 
         # Set current if specified
         if args.current is not None:
             psu.set_current(args.current)
-            logger.debug(f"Current set to {args.current} A")
+            logger.debug("Current set to %s A", args.current)
 
         # Set output state if specified
         if args.output is not None:
             enable = args.output == "on"
             psu.set_output_state(enable)
             state = "ON" if enable else "OFF"
-            logger.info(f"Output set to {state}")
+            logger.info("Output set to %s", state)
 
         # Always report status if requested or if no settings were changed
         if args.status or (
             args.voltage is None and args.current is None and args.output is None
         ):
-            v_set = psu.get_voltage()
-            i_set = psu.get_current()
-            output = "ON" if psu.get_output_state() else "OFF"
+            v_set, i_set, outp, channel = psu.query_many(
+                "SOUR:VOLT?", "SOUR:CURR?", "OUTP?", "INST:NSEL?"
+            )
+            is_on = psu.parse_output_state(outp)
+            output = "ON" if is_on else "OFF"
 
             print("\nCurrent settings:")
-            print(f" - channel: {psu.query_channel()}")
-            print(f" - voltage setting: {v_set:.3f} V")
-            print(f" - current setting: {i_set:.3f} A")
+            print(f" - channel: {int(channel)}")
+            print(f" - voltage setting: {float(v_set):.3f} V")
+            print(f" - current setting: {float(i_set):.3f} A")
             print(f" - output state: {output}")
 
             # Only show measurements if output is on
-            if psu.get_output_state():
+            if is_on:
                 v_measured, i_measured = psu.measure()
                 print("\nMeasured values:")
                 print(f" - voltage: {v_measured:.3f} V")
@@ -1,7 +1,10 @@
 import logging
+import multiprocessing
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
+import matplotlib
 import pandas as pd
 
 from analysis.transients import create_temperature_plots
@@ -19,8 +22,23 @@ DEFAULT_POWER_PER_CARD = 20.0  # W
 
 RESULTS_DIR = "results"
 
-
-@dataclass
+# Column types of the monitoring CSV (see MonitoringSession._initialize_csv)
+MEASUREMENT_DTYPES = {
+    "elapsed_time": "float64",
+    "card_serial": "str",
+    "channel": "int8",
+    "temperature": "float32",
+    "load_power": "float32",
+    "ot_shutdown_t": "float32",
+    "ot_ev": "bool",
+    "voltage": "float32",
+    "current": "float32",
+    "steady_state": "bool",
+    "temp_rate_per_min": "float32",
+}
+
+
+@dataclass(frozen=True, slots=True)
 class StepParams:
     """Parameters for a scenario step.
 
@@ -39,10 +57,13 @@ class StepParams:
     serials_to_set_power: list[str] | None = None
 
 
-def set_fan_voltage(voltage: float, current: float, enable: bool = True):
+def set_fan_voltage(
+    psu: RSPowerSupply, voltage: float, current: float, enable: bool = True
+):
     """Set the fan voltage of the power supply.
 
     Args:
+        psu (RSPowerSupply): Connected power supply driving the fans
         voltage (float): Voltage to set (between 0 and 12 V)
         current (float): Current to set (between 0 and 2 A)
         enable (bool): Whether to enable the output
@@ -53,24 +74,39 @@ def set_fan_voltage(voltage: float, current: float, enable: bool = True):
         raise ValueError(f"Current must be between {MIN_I} and {MAX_I} A")
 
     try:
-        psu = RSPowerSupply(PSU_IP)
         psu.select_channel(FAN_CHANNEL)
         psu.set_voltage(voltage)
         psu.set_current(current)
         psu.set_output_state(enable)
-
     except Exception as e:
         print(f"Error setting fan voltage: {e}")
-    finally:
-        if psu:
-            psu.disconnect()
 
 
-def plot_step_data(file_path: str):
+def read_step_data(file_path: str | Path) -> pd.DataFrame:
+    """Read the monitoring data of a scenario step.
+
+    Uses the pyarrow CSV parser if available, the default C parser otherwise.
+
+    Args:
+        file_path (str | Path): Path to the CSV file containing the monitoring data
+    """
+    try:
+        return pd.read_csv(file_path, engine="pyarrow", dtype=MEASUREMENT_DTYPES)
+    except ImportError:
+        return pd.read_csv(file_path, dtype=MEASUREMENT_DTYPES)
+
+
+def plot_step_data(file_path: str, executor: Executor | None = None) -> list[Future]:
     """Plot the data from the monitoring session.
 
     Args:
         file_path (str): Path to the CSV file containing the monitoring data
+        executor (Executor | None): If given, both plots are submitted to it
+            (and rendered side by side if it has two workers); otherwise they
+            are drawn right away
+
+    Returns:
+        list: Futures of the submitted plots (empty if drawn right away)
     """
     file_path = Path(file_path)
     base_name = file_path.stem
@@ -78,23 +114,60 @@ def plot_step_data(file_path: str):
 
     output_transients = output_dir / "transients"
     output_heatmaps = output_dir / "heatmaps"
-    df = pd.read_csv(file_path)
+    df = read_step_data(file_path)
 
     output_transients.mkdir(parents=True, exist_ok=True)
     output_heatmaps.mkdir(parents=True, exist_ok=True)
 
-    create_temperature_plots(df, output_transients / f"{base_name}.png")
-    generate_heatmap_grid(df, output_heatmaps / f"{base_name}.png")
+    plots = (
+        (create_temperature_plots, output_transients / f"{base_name}.png"),
+        (generate_heatmap_grid, output_heatmaps / f"{base_name}.png"),
+    )
+    if executor is None:
+        for plot, output_path in plots:
+            plot(df, output_path)
+        return []
+    return [executor.submit(plot, df, output_path) for plot, output_path in plots]
+
+
+def make_plot_executor() -> ProcessPoolExecutor:
+    """Create long-lived worker processes for drawing step plots.
+
+    pyplot keeps global state that is not thread-safe, so plots are drawn in
+    separate processes. They are spawned rather than forked, since the
+    scenario process runs a worker thread per card, and they are started once
+    for the whole scenario instead of once per step. There are two workers,
+    so the transient and heatmap plots of a step are rendered in parallel.
+    """
+    return ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=matplotlib.use,
+        initargs=("Agg",),
+    )
+
+
+def _log_plot_result(future: Future):
+    if future.exception() is not None:
+        logging.getLogger("scenario").error(
+            "Plotting step data failed: %s", future.exception()
+        )
 
 
 def scenario_step(
-    crate_manager: DIOTCrateManager, step_params: StepParams
+    crate_manager: DIOTCrateManager,
+    step_params: StepParams,
+    psu: RSPowerSupply,
+    plot_executor: Executor | None = None,
 ) -> tuple[bool, float]:
     """Run a scenario step.
 
     Args:
         crate_manager (DIOTCrateManager): The crate manager instance
         step_params (StepParams): The parameters for the step
+        psu (RSPowerSupply): Power supply driving the fans
+        plot_executor (Executor | None): If given, the step data is plotted in
+            the background so the next step can start right away
 
     Returns:
         tuple: A tuple containing:
@@ -120,22 +193,24 @@ def scenario_step(
     )
 
     logger.info("Step parameters:")
-    logger.info(f"  - Power: {power} W")
-    logger.info(f"  - Fan voltage: {fan_voltage} V")
-    logger.info(f"  - Save directory: {save_dir}")
-    logger.info(f"  - Step number: {step_no}")
-    logger.info(f"  - Serial numbers to set power: {serials_to_set_power}")
-    logger.info(f"  - Available cards: {available_cards}")
-    logger.info(f"  - Monitoring session: {monitor_session.session_name}")
-    logger.info(f"  - Monitoring session file path: {monitor_session.file_path}")
-
-    set_fan_voltage(fan_voltage, 2.0, enable=True)
-
-    # zero output power for all cards
-    crate_manager.set_cards_load_power(
-        serial=available_cards,
-        power=0.0,
-    )
+    logger.info("  - Power: %s W", power)
+    logger.info("  - Fan voltage: %s V", fan_voltage)
+    logger.info("  - Save directory: %s", save_dir)
+    logger.info("  - Step number: %s", step_no)
+    logger.info("  - Serial numbers to set power: %s", serials_to_set_power)
+    logger.info("  - Available cards: %s", available_cards)
+    logger.info("  - Monitoring session: %s", monitor_session.session_name)
+    logger.info("  - Monitoring session file path: %s", monitor_session.file_path)
+
+    set_fan_voltage(psu, fan_voltage, 2.0, enable=True)
+
+    # zero output power for the remaining cards; the selected ones are set below
+    cards_to_zero = [sn for sn in available_cards if sn not in serials_to_set_power]
+    if cards_to_zero:
+        crate_manager.set_cards_load_power(
+            serial=cards_to_zero,
+            power=0.0,
+        )
 
     # set power only for the specified cards
     crate_manager.set_cards_load_power(
@@ -158,13 +233,23 @@ def scenario_step(
         logger.info("Monitoring interrupted by user.")
         crate_manager.shutdown_all_loads()
     except Exception as e:
-        logger.error(f"Error during monitoring: {e}", exc_info=True)
+        logger.error("Error during monitoring: %s", e, exc_info=True)
         crate_manager.shutdown_all_loads()
         raise Exception from e
     finally:
-        plot_step_data(monitor_session.file_path)
+        if plot_executor is None:
+            plot_step_data(monitor_session.file_path)
+        else:
+            for future in plot_step_data(monitor_session.file_path, plot_executor):
+                future.add_done_callback(_log_plot_result)
         logger.info("Monitoring session finished.")
 
+    try:
+        fan_v, fan_i = psu.measure_all()[FAN_CHANNEL - 1]
+        logger.info("Fan PSU at end of step: %.3f V, %.3f A", fan_v, fan_i)
+    except Exception as e:
+        logger.warning("Could not read back the fan PSU: %s", e)
+
     if not monitor_session.all_steady:
         logger.warning("Monitoring session did not reach steady state.")
         crate_manager.shutdown_all_loads()
@@ -173,72 +258,41 @@ def scenario_step(
     return True, elapsed_time
 
 
-def setup_scenario_steps(results_dir: str) -> list[StepParams]:
+def setup_scenario_steps(results_dir: str) -> tuple[StepParams, ...]:
     """Setup the scenario steps.
 
     Args:
         results_dir (str): Directory to save the monitoring data
 
     Returns:
-        list: A list of StepParams objects representing the steps
+        tuple: StepParams objects representing the steps
     """
-    steps = []
-    # All cards will be set to the same power
-    step = StepParams(
-        power=DEFAULT_POWER_PER_CARD,
-        fan_voltage=12.0,
-        save_dir=results_dir,
-        step_no=len(steps),
-        serials_to_set_power=None,
+    # (power per card, fan voltage, serial numbers to set power to)
+    step_settings = (
+        # All cards will be set to the same power
+        (DEFAULT_POWER_PER_CARD, 12.0, None),
+        # Every second board will be set to the same power
+        (DEFAULT_POWER_PER_CARD, 12.0, [f"DT{i:02d}" for i in range(0, 9, 2)]),
+        # Every second bard but starting from the second one
+        (DEFAULT_POWER_PER_CARD, 12.0, [f"DT{i:02d}" for i in range(1, 9, 2)]),
+        # Disable all loads and wait for the system to cool down
+        # before the next step
+        (0.0, 12.0, None),
+        # Next steps - gradually increase the power with disabled fans and wait
+        # for OT to be reached
+        *((pwr, 0.0, None) for pwr in (5.0, 10.0, 15.0, 20.0, 25.0, 30.0, 35.0, 40.0)),
     )
-    steps.append(step)
-
-    # Every second board will be set to the same power
-    step = StepParams(
-        power=DEFAULT_POWER_PER_CARD,
-        fan_voltage=12.0,
-        save_dir=results_dir,
-        step_no=len(steps),
-        serials_to_set_power=[f"DT{i:02d}" for i in range(0, 9, 2)],
-    )
-    steps.append(step)
-
-    # Every second bard but starting from the second one
-    step = StepParams(
-        power=DEFAULT_POWER_PER_CARD,
-        fan_voltage=12.0,
-        save_dir=results_dir,
-        step_no=len(steps),
-        serials_to_set_power=[f"DT{i:02d}" for i in range(1, 9, 2)],
-    )
-    steps.append(step)
-
-    # Disable all loads and wait for the system to cool down
-    # before the next step
-    step = StepParams(
-        power=0.0,
-        fan_voltage=12.0,
-        save_dir=results_dir,
-        step_no=len(steps),
-        serials_to_set_power=None,
-    )
-    steps.append(step)
-
-    # Next steps - gradually increase the power with disabled fans and wait for OT
-    # to be reached
-    fan_failure_powers = [5.0, 10.0, 15.0, 20.0, 25.0, 30.0, 35.0, 40.0]
-    len_steps = len(steps)
-    for idx, pwr in enumerate(fan_failure_powers):
-        step = StepParams(
-            power=pwr,
-            fan_voltage=0.0,
+
+    return tuple(
+        StepParams(
+            power=power,
+            fan_voltage=fan_voltage,
             save_dir=results_dir,
-            step_no=len_steps + idx,
-            serials_to_set_power=None,
+            step_no=step_no,
+            serials_to_set_power=serials,
         )
-        steps.append(step)
-
-    return steps
+        for step_no, (power, fan_voltage, serials) in enumerate(step_settings)
+    )
 
 
 def main():
@@ -267,6 +321,9 @@ def main():
     pil_logger = logging.getLogger("PIL")
     pil_logger.setLevel(logging.WARNING)
 
+    # Plots are only saved to files; skip GUI backend discovery and setup
+    matplotlib.use("Agg")
+
     logger.debug("Starting main function")
 
     args = parser.parse_args()
@@ -292,22 +349,33 @@ def main():
             hysteresis=HYSTERESIS,
         )
 
-        for step in scenario_steps:
-            is_steady, elapsed_time = scenario_step(
-                crate_manager=crate_manager,
-                step_params=step,
-            )
-            if not is_steady:
-                logger.warning(f"Step {step.step_no} did not reach steady state.")
-                break
-            logger.info(f"Step {step.step_no} completed successfully.")
-            logger.info(f"Elapsed time: {elapsed_time:.2f} seconds")
+        # Connect to the fan PSU once for the whole scenario; plots of a step
+        # are drawn in the plot processes while the next step runs
+        with (
+            RSPowerSupply(PSU_IP) as psu,
+            make_plot_executor() as plot_executor,
+        ):
+            for step in scenario_steps:
+                is_steady, elapsed_time = scenario_step(
+                    crate_manager=crate_manager,
+                    step_params=step,
+                    psu=psu,
+                    plot_executor=plot_executor,
+                )
+                if not is_steady:
+                    logger.warning("Step %s did not reach steady state.", step.step_no)
+                    break
+                logger.info("Step %s completed successfully.", step.step_no)
+                logger.info("Elapsed time: %.2f seconds", elapsed_time)
     except Exception as e:
-        logger.error(f"Error during monitoring: {e}", exc_info=True)
+        logger.error("Error during monitoring: %s", e, exc_info=True)
     else:
         logger.info("All steps completed successfully.")
     finally:
-        crate_manager.shutdown_all_loads()
+        try:
+            crate_manager.shutdown_all_loads()
+        finally:
+            crate_manager.close()
 
 
 if __name__ == "__main__":